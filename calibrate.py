@@ -0,0 +1,80 @@
+import logging
+import os
+import time
+import typing
+
+import utils
+
+__all__ = [
+    "speed_factor",
+    "calibrate",
+    "scale_limit",
+    "normalize",
+    "info",
+]
+
+CALIBRATE = os.getenv("CALIBRATE", "1") == "1"
+CALIBRATION_REFERENCE = float(os.getenv("CALIBRATION_REFERENCE", 0))
+CALIBRATION_ROUNDS = int(os.getenv("CALIBRATION_ROUNDS", 5))
+NORMALIZE_TIME = os.getenv("NORMALIZE_TIME", None) == "1"
+
+speed_factor: float = 1.0
+benchmark_time: float | None = None
+
+logger = logging.getLogger("judgyse.calibrate")
+logger.addHandler(utils.console_handler("Calibrate"))
+
+
+def workload() -> int:
+    total = 0
+    for i in range(300_000):
+        total = (total * 31 + i) % 1_000_000_007
+
+    numbers = [(i * 7_919) % 100_003 for i in range(100_000)]
+    numbers.sort()
+
+    table: dict[int, int] = {}
+    for number in numbers:
+        table[number & 0xFFFF] = table.get(number & 0xFFFF, 0) + number
+
+    memory = bytearray(16 * 1024 * 1024)
+    for offset in range(0, len(memory), 4096):
+        memory[offset] = offset & 0xFF
+
+    return total + len(table) + memory[4096]
+
+
+def benchmark(rounds: int = CALIBRATION_ROUNDS) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        workload()
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+
+def calibrate() -> float:
+    global speed_factor, benchmark_time
+
+    benchmark_time = benchmark()
+    if CALIBRATION_REFERENCE > 0:
+        speed_factor = CALIBRATION_REFERENCE / benchmark_time
+    logger.info("benchmark took %.4fs, speed factor %.3f", benchmark_time, speed_factor)
+    return speed_factor
+
+
+def scale_limit(seconds: float) -> float:
+    return seconds / speed_factor if NORMALIZE_TIME else seconds
+
+
+def normalize(seconds: float) -> float:
+    return seconds * speed_factor if NORMALIZE_TIME and seconds >= 0 else seconds
+
+
+def info() -> dict[str, typing.Any]:
+    return {
+        "factor": speed_factor,
+        "benchmark": benchmark_time,
+        "reference": CALIBRATION_REFERENCE or None,
+        "normalized": NORMALIZE_TIME,
+    }
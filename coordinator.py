@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import os
+import typing
+
+import websockets
+import websockets.exceptions
+
+import declare
+import judge
+import registry
+import utils
+from exception import ABORTED, COMPILE_ERROR, SYSTEM_ERROR
+
+__all__ = [
+    "WORKERS",
+    "enabled",
+    "shards",
+    "dispatch",
+]
+
+WORKERS = [url for url in os.getenv("WORKERS", "").split(",") if url]
+SHARDS_PER_WORKER = int(os.getenv("SHARDS_PER_WORKER", 1))
+WORKER_TIMEOUT = float(os.getenv("WORKER_TIMEOUT", 60))
+
+enabled = len(WORKERS) > 0
+
+logger = logging.getLogger("judgyse.coordinator")
+logger.addHandler(utils.console_handler("Coordinator"))
+
+
+class WorkerLost(Exception):
+    pass
+
+
+def shards(test_range: typing.Tuple[int, int], count: int) -> typing.List[typing.List[int]]:
+    indices = list(range(test_range[0], test_range[1] + 1))
+    count = max(1, min(count, len(indices)))
+    size, extra = divmod(len(indices), count)
+    result = []
+    start = 0
+    for shard in range(count):
+        end = start + size + (1 if shard < extra else 0)
+        result.append(indices[start:end])
+        start = end
+    return result
+
+
+def ranges(indices: typing.List[int]) -> typing.List[typing.List[int]]:
+    result: typing.List[typing.List[int]] = []
+    for index in sorted(indices):
+        if result and result[-1][-1] + 1 == index:
+            result[-1].append(index)
+        else:
+            result.append([index])
+    return result
+
+
+class Worker:
+    def __init__(self, url: str, session: declare.JudgeSession, options: judge.Options):
+        self.url = url
+        self.session = session
+        self.options = options
+        self.ws = None
+
+    async def send(self, command: str, data: typing.Any = None) -> None:
+        await self.ws.send(json.dumps([command, data]))
+
+    async def recv(self) -> typing.Tuple[str, typing.Any]:
+        try:
+            message = await asyncio.wait_for(self.ws.recv(), WORKER_TIMEOUT)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            raise WorkerLost(self.url) from error
+        command, data = utils.padding(json.loads(message), 2)
+        return command, data
+
+    async def expect(self, command: str) -> typing.Any:
+        received, data = await self.recv()
+        if received != command or (isinstance(data, dict) and data.get("status", 0) != 0):
+            raise WorkerLost(f"{self.url}: expected {command}, got {received} {data}")
+        return data
+
+    async def connect(self) -> None:
+        try:
+            self.ws = await websockets.connect(self.url, max_size=None)
+        except (OSError, websockets.exceptions.WebSocketException) as error:
+            raise WorkerLost(self.url) from error
+
+    async def close(self) -> None:
+        if self.ws is not None:
+            try:
+                await self.send("close")
+                await self.ws.close()
+            except websockets.exceptions.WebSocketException:
+                pass
+
+    async def run(
+            self,
+            shard: typing.List[int],
+            output: asyncio.Queue,
+            done: typing.Set[int],
+    ) -> None:
+        session = self.session
+        await self.send("command.start")
+        await self.send("command.init", {
+            "submission_id": session.submission_id,
+            "language": list(session.language),
+            "compiler": list(session.compiler),
+            "test_range": [shard[0], shard[-1]],
+            "test_file": list(session.test_file),
+            "test_type": session.test_type,
+            "judge_mode": session.judge_mode.model_dump(),
+            "limit": session.limit.model_dump(),
+            "point": session.point,
+            "options": self.options.model_dump(),
+        })
+        await self.expect("judge.init")
+
+        code = registry.snapshot().languages[session.language[0]].file.format(id=session.submission_id)
+        await self.send("command.code", [utils.read(os.path.join(judge.execution_dir, code)), False])
+        await self.expect("judge.write:code")
+
+        if session.judge_mode.mode == 1:
+            await self.send("command.judger", [utils.read(os.path.join(judge.execution_dir, "judger.py")), False])
+            await self.expect("judge.write:judger")
+
+        if session.test_type == "interactive":
+            await self.send("command.interactor", [
+                utils.read(os.path.join(judge.generation_dir, judge.INTERACTOR_FILE)),
+                False,
+            ])
+            await self.expect("judge.write:interactor")
+
+        for index in shard:
+            if not judge.testcase_exists(index, session.test_file[0]):
+                continue
+            await self.send("command.testcase", [
+                index,
+                judge.testcase_read(index, session.test_file[0]),
+                judge.testcase_read(index, session.test_file[1]),
+                False,
+            ])
+            await self.expect("judge.write:testcase")
+
+        await self.send("command.judge")
+        while True:
+            command, data = await self.recv()
+            match command:
+                case "judge.compiler":
+                    await output.put(("compiler", "warn", {"message": data}))
+
+                case "judge.result":
+                    if data["position"] not in done:
+                        done.add(data["position"])
+                        await output.put((data["position"], data["status"], data))
+
+                case "judge.error:compiler":
+                    raise COMPILE_ERROR(data)
+
+                case "judge.error:system":
+                    raise SYSTEM_ERROR(data)
+
+                case "judge.aborted":
+                    raise ABORTED()
+
+                case "judge.done":
+                    return
+
+
+async def dispatch(
+        session: declare.JudgeSession,
+        options: judge.Options,
+        abort: asyncio.Event,
+) -> typing.AsyncIterator[
+    tuple[typing.Literal["compiler", "overall"] | int, declare.StatusCode, dict[str, typing.Any]]
+]:
+    total = session.test_range[1] - session.test_range[0] + 1
+    pending: asyncio.Queue = asyncio.Queue()
+    for shard in shards(session.test_range, len(WORKERS) * SHARDS_PER_WORKER):
+        pending.put_nowait(shard)
+
+    output: asyncio.Queue = asyncio.Queue()
+    done: typing.Set[int] = set()
+    forwarded = options.model_copy(update={"fail_fast": False})
+
+    async def work(url: str) -> None:
+        worker = Worker(url, session, forwarded)
+        shard: typing.List[int] = []
+        try:
+            await worker.connect()
+            while len(done) < total:
+                try:
+                    shard = await asyncio.wait_for(pending.get(), 0.1)
+                except asyncio.TimeoutError:
+                    continue
+                await worker.run(shard, output, done)
+                shard = []
+
+        except WorkerLost as error:
+            logger.warning("lost worker %s: %s", url, error)
+            for remaining in ranges([index for index in shard if index not in done]):
+                pending.put_nowait(remaining)
+
+        except Exception as error:
+            await output.put(error)
+
+        finally:
+            await worker.close()
+            await output.put(url)
+
+    tasks = [asyncio.create_task(work(url)) for url in WORKERS]
+    running = len(tasks)
+    compiler_warned = False
+    stopped = False
+    statuses: typing.List[int] = []
+    try:
+        while running:
+            if abort.is_set():
+                raise ABORTED()
+
+            try:
+                item = await asyncio.wait_for(output.get(), 1)
+            except asyncio.TimeoutError:
+                continue
+
+            if isinstance(item, Exception):
+                raise item
+
+            if isinstance(item, str):
+                running -= 1
+                continue
+
+            position, status, data = item
+            if position == "compiler":
+                if not compiler_warned:
+                    compiler_warned = True
+                    yield item
+                continue
+
+            statuses.append(status)
+            yield position, status, data
+
+            if options.fail_fast and status != declare.StatusCode.ACCEPTED.value:
+                logger.debug("testcase %s failed, cancelling %d workers", position, running)
+                stopped = True
+                break
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if not stopped and len(done) < total:
+        raise SYSTEM_ERROR(f"no judge worker available for {total - len(done)} testcases")
+
+    yield "overall", max(statuses), {}
@@ -44,3 +44,7 @@ class UNKNOWN_ERROR(Exception):
 
 class JUDGER_ERROR(Exception):
     pass
+
+
+class GENERATOR_ERROR(Exception):
+    pass
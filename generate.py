@@ -0,0 +1,233 @@
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import threading
+import typing
+import uuid
+
+import docker.errors
+import pydantic
+import requests
+
+import governor
+import judge
+import registry
+import utils
+from exception import GENERATOR_ERROR
+
+__all__ = [
+    "Program",
+    "Request",
+    "generate",
+]
+
+GENERATOR_TIMEOUT = float(os.getenv("GENERATOR_TIMEOUT", 10))
+GENERATOR_WORKERS = int(os.getenv("GENERATOR_WORKERS", os.cpu_count() or 1))
+GENERATED_CACHE = os.getenv("GENERATED_CACHE", None)
+GENERATED_CACHE_SIZE = utils.mem_convert(os.getenv("GENERATED_CACHE_SIZE", "1024m"))
+
+logger = logging.getLogger("judgyse.generate")
+logger.addHandler(utils.console_handler("Generate"))
+
+
+class Program(pydantic.BaseModel):
+    language: tuple[str, int | None]
+    compiler: tuple[str, str]
+    source: str
+
+    def digest(self) -> str:
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()
+
+
+class Request(pydantic.BaseModel):
+    generator: Program
+    reference: Program | None = None
+    tests: dict[int, list[str]]
+
+
+def cache_dir() -> str:
+    path = GENERATED_CACHE or os.path.join(judge.judge_dir, "generated")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def prepare(name: str, program: Program) -> typing.Tuple[judge.Build, str]:
+    profiles = registry.snapshot()
+    if program.language[0] not in profiles.languages:
+        raise GENERATOR_ERROR(f"{name}: unknown language {program.language[0]}")
+    if program.compiler[0] not in profiles.compilers:
+        raise GENERATOR_ERROR(f"{name}: unknown compiler {program.compiler[0]}")
+
+    directory = os.path.join(judge.generation_dir, name)
+    os.makedirs(directory, exist_ok=True)
+    source = profiles.languages[program.language[0]].file.format(id=name)
+    utils.write(os.path.join(directory, source), program.source)
+    return judge.build(name, program.language, program.compiler, directory), directory
+
+
+def run(
+        program: judge.Build,
+        directory: str,
+        args: typing.List[str],
+        stdin: str | None,
+        destination: str,
+) -> None:
+    temporary = f"{destination}.{uuid.uuid4().hex}"
+    argv = [*program.execute, *args]
+    try:
+        with governor.node.reserve(
+                cpu=1,
+                memory=judge.mem_parse(judge.COMPILER_MEM_LIMIT),
+                containers=int(judge.RUN_IN_DOCKER),
+        ):
+            if not judge.RUN_IN_DOCKER:
+                with open(stdin or os.devnull, "rb") as input_file, open(temporary, "wb") as output_file:
+                    subprocess.run(
+                        argv,
+                        cwd=directory,
+                        stdin=input_file,
+                        stdout=output_file,
+                        stderr=subprocess.PIPE,
+                        timeout=GENERATOR_TIMEOUT,
+                        check=True,
+                        preexec_fn=utils.address_space_limit(
+                            judge.mem_parse(judge.COMPILER_MEM_LIMIT)
+                        ) if judge.HARD_LIMIT else None,
+                    )
+
+            else:
+                container = judge.DockerClient.containers.run(
+                    image=program.image,
+                    command=["/bin/bash", "-c", f"{shlex.join(argv)} < /stdin" if stdin else shlex.join(argv)],
+                    detach=True,
+                    network_disabled=True,
+                    working_dir="/generator",
+                    volumes=[
+                        f"{judge.host_path(directory)}:/generator",
+                        *([f"{judge.host_path(stdin)}:/stdin:ro"] if stdin else []),
+                    ],
+                    mem_limit=judge.COMPILER_MEM_LIMIT,
+                )
+                try:
+                    try:
+                        state = container.wait(timeout=GENERATOR_TIMEOUT)
+                    except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as error:
+                        with contextlib.suppress(docker.errors.APIError):
+                            container.kill()
+                        raise GENERATOR_ERROR(f"{shlex.join(args)}: timed out after {GENERATOR_TIMEOUT}s") from error
+
+                    if state["StatusCode"] != 0:
+                        raise GENERATOR_ERROR(
+                            f"{shlex.join(args)}: exited with {state['StatusCode']}\n"
+                            f"{container.logs(stdout=False, stderr=True).decode()}"
+                        )
+                    output: bytes = container.logs(stdout=True, stderr=False)
+                finally:
+                    with contextlib.suppress(docker.errors.APIError):
+                        container.remove(force=True)
+
+                with open(temporary, "wb") as output_file:
+                    output_file.write(output)
+
+            os.replace(temporary, destination)
+
+    except governor.BudgetExceeded as error:
+        raise GENERATOR_ERROR(*error.args) from error
+
+    except subprocess.TimeoutExpired as error:
+        raise GENERATOR_ERROR(f"{shlex.join(args)}: timed out after {GENERATOR_TIMEOUT}s") from error
+
+    except subprocess.CalledProcessError as error:
+        raise GENERATOR_ERROR(f"{shlex.join(args)}: exited with {error.returncode}\n{error.stderr.decode()}") from error
+
+    except (docker.errors.ContainerError, docker.errors.APIError, OSError) as error:
+        raise GENERATOR_ERROR(f"{shlex.join(args)}: {error}") from error
+
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def cached(key: typing.Any, produce: typing.Callable[[str], None]) -> str:
+    path = os.path.join(cache_dir(), hashlib.sha256(json.dumps(key).encode()).hexdigest())
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        produce(path)
+    return path
+
+
+def evict() -> None:
+    entries = []
+    for entry in os.scandir(cache_dir()):
+        if entry.is_file() and "." not in entry.name:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= GENERATED_CACHE_SIZE:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def install(source: str, destination: str) -> None:
+    size = os.path.getsize(source)
+    if not governor.node.charge(judge.generation_dir, disk=size):
+        raise GENERATOR_ERROR(f"node disk budget exhausted, {size} bytes requested")
+    shutil.copyfile(source, destination)
+
+
+def generate(request: Request, test_file: typing.Tuple[str, str]) -> int:
+    builds: typing.Dict[str, typing.Tuple[judge.Build, str]] = {}
+    lock = threading.Lock()
+
+    def compiled(name: str, program: Program) -> typing.Tuple[judge.Build, str]:
+        with lock:
+            if name not in builds:
+                builds[name] = prepare(name, program)
+            return builds[name]
+
+    generator_hash = request.generator.digest()
+    reference_hash = request.reference.digest() if request.reference is not None else None
+
+    def materialize(index: int, args: typing.List[str]) -> None:
+        directory = os.path.join(judge.testcases_dir, str(index))
+        os.makedirs(directory, exist_ok=True)
+
+        input_file = cached(
+            [generator_hash, args],
+            lambda path: run(*compiled("generator", request.generator), args, None, path),
+        )
+        install(input_file, os.path.join(directory, test_file[0]))
+
+        expect_file = os.path.join(directory, test_file[1])
+        if request.reference is not None:
+            install(cached(
+                [reference_hash, utils.digest(input_file)],
+                lambda path: run(*compiled("reference", request.reference), [], input_file, path),
+            ), expect_file)
+        elif not os.path.exists(expect_file):
+            utils.write(expect_file, "")
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max(1, GENERATOR_WORKERS)) as executor:
+            for future in [executor.submit(materialize, index, args) for index, args in request.tests.items()]:
+                future.result()
+    except OSError as error:
+        raise GENERATOR_ERROR(str(error)) from error
+    finally:
+        evict()
+
+    logger.debug("generated %d testcases, compiled %s", len(request.tests), sorted(builds) or "nothing")
+    return len(request.tests)
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+import time
+import typing
+
+import psutil
+
+import utils
+
+__all__ = [
+    "Governor",
+    "BudgetExceeded",
+    "node",
+]
+
+GOVERNOR_CPU_SLOTS = int(os.getenv("GOVERNOR_CPU_SLOTS", os.cpu_count() or 1))
+GOVERNOR_MEMORY = os.getenv("GOVERNOR_MEMORY", None)
+GOVERNOR_DISK = os.getenv("GOVERNOR_DISK", None)
+GOVERNOR_CONTAINERS = int(os.getenv("GOVERNOR_CONTAINERS", 8))
+GOVERNOR_TIMEOUT = float(os.getenv("GOVERNOR_TIMEOUT", 300))
+
+logger = logging.getLogger("judgyse.governor")
+logger.addHandler(utils.console_handler("Governor"))
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Governor:
+    def __init__(self, **capacity: int | None) -> None:
+        self.capacity = capacity
+        self.used = {name: 0 for name in capacity}
+        self.held: typing.Dict[str, typing.Dict[str, int]] = {}
+        self.condition = threading.Condition()
+
+    def fits(self, amounts: typing.Dict[str, int]) -> bool:
+        return all(
+            self.capacity[name] is None or self.used[name] + amount <= self.capacity[name]
+            for name, amount in amounts.items()
+        )
+
+    def check(self, amounts: typing.Dict[str, int]) -> None:
+        for name, amount in amounts.items():
+            if name not in self.capacity:
+                raise KeyError(name)
+            if self.capacity[name] is not None and amount > self.capacity[name]:
+                raise BudgetExceeded(f"{name}: {amount} requested, node budget is {self.capacity[name]}")
+
+    def acquire(self, timeout: float | None = GOVERNOR_TIMEOUT, **amounts: int) -> None:
+        self.check(amounts)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            if not self.fits(amounts):
+                logger.debug("waiting for %s, in use %s", amounts, self.used)
+            while not self.fits(amounts):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise BudgetExceeded(f"timed out waiting for {amounts}, in use {self.used}")
+                self.condition.wait(remaining)
+            for name, amount in amounts.items():
+                self.used[name] += amount
+
+    async def acquire_async(self, timeout: float | None = GOVERNOR_TIMEOUT, **amounts: int) -> None:
+        self.check(amounts)
+        with self.condition:
+            if self.fits(amounts):
+                for name, amount in amounts.items():
+                    self.used[name] += amount
+                return
+        await asyncio.to_thread(self.acquire, timeout, **amounts)
+
+    def release(self, **amounts: int) -> None:
+        with self.condition:
+            for name, amount in amounts.items():
+                self.used[name] = max(self.used[name] - amount, 0)
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def reserve(self, timeout: float | None = GOVERNOR_TIMEOUT, **amounts: int) -> typing.Iterator[None]:
+        self.acquire(timeout, **amounts)
+        try:
+            yield
+        finally:
+            self.release(**amounts)
+
+    def charge(self, owner: str, **amounts: int) -> bool:
+        with self.condition:
+            if not self.fits(amounts):
+                return False
+            held = self.held.setdefault(owner, {})
+            for name, amount in amounts.items():
+                self.used[name] += amount
+                held[name] = held.get(name, 0) + amount
+            return True
+
+    def discharge(self, owner: str) -> None:
+        with self.condition:
+            held = self.held.pop(owner, None)
+        if held:
+            self.release(**held)
+
+    def available(self, name: str) -> int | None:
+        with self.condition:
+            if self.capacity[name] is None:
+                return None
+            return max(self.capacity[name] - self.used[name], 0)
+
+    def snapshot(self) -> dict[str, dict[str, int | None]]:
+        with self.condition:
+            return {
+                name: {
+                    "capacity": self.capacity[name],
+                    "used": self.used[name],
+                    "available": None if self.capacity[name] is None else self.capacity[name] - self.used[name],
+                }
+                for name in self.capacity
+            }
+
+
+node = Governor(
+    cpu=GOVERNOR_CPU_SLOTS,
+    memory=utils.mem_convert(GOVERNOR_MEMORY) if GOVERNOR_MEMORY else psutil.virtual_memory().total,
+    disk=utils.mem_convert(GOVERNOR_DISK) if GOVERNOR_DISK else None,
+    containers=GOVERNOR_CONTAINERS,
+)
@@ -0,0 +1,127 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import typing
+
+__all__ = [
+    "Interactor",
+]
+
+MESSAGE_SIZE = 65536
+
+
+class Interactor:
+    process: subprocess.Popen = None
+    control: socket.socket = None
+
+    def __init__(self, path: str, cwd: str, timeout: float) -> None:
+        self.path = path
+        self.cwd = cwd
+        self.timeout = timeout
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        self.control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), self.path, str(remote.fileno())],
+                cwd=self.cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=[remote.fileno()],
+            )
+        finally:
+            remote.close()
+
+        self.control.settimeout(self.timeout)
+        try:
+            ready = self.control.recv(MESSAGE_SIZE)
+        except OSError:
+            ready = b""
+        if ready != b"ready":
+            self.stop()
+            raise RuntimeError("interactor failed to start")
+
+    def stop(self) -> None:
+        if self.control is not None:
+            self.control.close()
+            self.control = None
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def send(self, input_file: str, expect_file: str, writer: int, reader: int) -> None:
+        if not self.alive:
+            self.start()
+
+        socket.send_fds(
+            self.control,
+            [json.dumps({"input": input_file, "expect": expect_file}).encode()],
+            [writer, reader],
+        )
+
+    def receive(self) -> typing.Dict[str, typing.Any]:
+        try:
+            message = self.control.recv(MESSAGE_SIZE)
+        except OSError:
+            message = b""
+        if not message:
+            self.process.kill()
+            self.stop()
+            raise RuntimeError("interactor did not answer")
+        return json.loads(message)
+
+
+def serve(path: str, fd: int) -> None:
+    import importlib.util
+    import traceback
+
+    spec = importlib.util.spec_from_file_location("interactor", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    control = socket.socket(fileno=fd)
+    control.send(b"ready")
+
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, MESSAGE_SIZE, 2)
+        if not message:
+            return
+
+        request = json.loads(message)
+        writer = os.fdopen(fds[0], "w")
+        reader = os.fdopen(fds[1], "r")
+        try:
+            with open(request["input"], "r") as file:
+                input_content = file.read()
+            with open(request["expect"], "r") as file:
+                expect_content = file.read()
+            reply = {"verdict": module.interact(reader, writer, input_content, expect_content)}
+        except BrokenPipeError:
+            reply = {"broken": True}
+        except BaseException:  # noqa
+            reply = {"error": traceback.format_exc()[-4096:]}
+        finally:
+            for stream in (writer, reader):
+                try:
+                    stream.close()
+                except BrokenPipeError:
+                    pass
+
+        control.send(json.dumps(reply).encode())
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], int(sys.argv[2]))
@@ -1,23 +1,35 @@
 import ast
 import asyncio
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os
 import queue
 import shlex
 import shutil
+import statistics
 import subprocess
 import sys
 import typing
+import uuid
 
 import docker
 import docker.errors
 import docker.models
 import docker.models.containers
+import pydantic
 import requests
 import urllib3
 
+import calibrate
 import declare
+import governor
+import interact
+import registry
+import store
 import utils
+import zygote
 from exception import (
     ABORTED,
     MEMORYLIMIT_EXCEEDED,
@@ -33,7 +45,21 @@ __all__ = [
     "judge_dir",
     "execution_dir",
     "testcases_dir",
+    "init",
+    "new_generation",
+    "load_testset",
+    "testcase_exists",
+    "testcase_read",
+    "images",
+    "build",
+    "prepull",
     "DockerClient",
+    "Options",
+    "Tolerance",
+    "Rerun",
+    "INTERACTOR_FILE",
+    "result_store",
+    "verdict_cache",
     "judge"
 ]
 
@@ -42,48 +68,40 @@ RUN_IN_DOCKER = os.getenv("RUN_IN_DOCKER", None) == "1"
 if sys.platform == "nt" and not RUN_IN_DOCKER:
     raise Exception("Windows is not supported, use Docker instead")
 
-DockerClient: docker.DockerClient = None
-if RUN_IN_DOCKER or INSIDE_DOCKER:
-    try:
-        DockerClient = docker.from_env()
-    except docker.errors.DockerException as error:
-        if error.__str__().startswith("Error while fetching server API version"):
-            raise Exception("Cannot connect to Docker daemon, is it running ?")
-        else:
-            raise error
-
-process_id: str = None
-judge_dir: str = None
-
-if INSIDE_DOCKER:
-    HOSTNAME = os.getenv("HOSTNAME", None)
-    process_id = DockerClient.api.inspect_container(HOSTNAME)["Name"].split("_")[-1]
-    judge_dir = os.path.join(os.path.abspath("evaluation"), process_id[1:])
-else:
-    judge_dir = os.path.abspath("evaluation")
-
-execution_dir = os.path.join(judge_dir, "execution")
-testcases_dir = os.path.join(judge_dir, "testcases")
+JUDGYSE_DIR = os.getenv("JUDGYSE_DIR", "/judgyse")
+CONTAINER_DIR = os.getenv("CONTAINER_DIR", "/judgyse")
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", None)
+SCRATCH_SIZE = os.getenv("SCRATCH_SIZE", None)
 WIPE = os.getenv("WIPE", None) == "1"
-if WIPE:
-    utils.wipe_data(execution_dir)
-    utils.wipe_data(testcases_dir)
-else:
-    if not os.path.exists(execution_dir):
-        os.makedirs(execution_dir)
-
-    if not os.path.exists(testcases_dir):
-        os.makedirs(testcases_dir, exist_ok=True)
 
 HARD_LIMIT = os.getenv("HARD_LIMIT", None) == "1"
 COMPILER_MEM_LIMIT = os.getenv("COMPILER_MEM_LIMIT", "1024m")
 TIME_PATH = os.getenv("TIME_PATH", None)
 TIMEOUT_PATH = os.getenv("TIMEOUT_PATH", None)
-if HARD_LIMIT:
-    if not os.path.exists(TIME_PATH):
-        raise Exception(f"{TIME_PATH} not found")
-    if not os.path.exists(TIMEOUT_PATH):
-        raise Exception(f"{TIMEOUT_PATH} not found")
+FEEDBACK_LIMIT = int(os.getenv("FEEDBACK_LIMIT", 256))
+STDOUT_FILE = ".judgyse_stdout"
+MEMORY_WATCHER = os.getenv("MEMORY_WATCHER", "1") == "1"
+ZYGOTE_LANGUAGES = [name for name in os.getenv("ZYGOTE_LANGUAGES", "").split(",") if name]
+JUDGER_IMAGE = "python:latest"
+INTERACTOR_FILE = "interactor.py"
+INTERACTOR_TIMEOUT = float(os.getenv("INTERACTOR_TIMEOUT", 5))
+INTERACTIVE_WALL_FACTOR = float(os.getenv("INTERACTIVE_WALL_FACTOR", 3))
+PREPULL_VERSIONS = os.getenv("PREPULL_VERSIONS", "latest").split(",")
+
+RESULT_STORE = os.getenv("RESULT_STORE", None) == "1"
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 4096))
+
+DockerClient: docker.DockerClient = None
+process_id: str = None
+judge_dir: str = None
+scratch_dir: str = None
+generation_dir: str = None
+execution_dir: str = None
+testcases_dir: str = None
+testset: utils.Testset = None
+result_store: store.ResultStore = None
+verdict_cache = utils.LRUCache(VERDICT_CACHE_SIZE)
+initialized = False
 
 stt = utils.str_to_timestamp
 mem_parse = utils.mem_convert
@@ -93,18 +111,472 @@ logger = logging.getLogger("judgyse.judge")
 logger.addHandler(utils.console_handler("Judge"))
 
 
+def init() -> None:
+    global DockerClient, process_id, judge_dir, scratch_dir, result_store, initialized
+
+    if initialized:
+        return
+
+    if HARD_LIMIT:
+        if not os.path.exists(TIME_PATH):
+            raise Exception(f"{TIME_PATH} not found")
+        if not os.path.exists(TIMEOUT_PATH):
+            raise Exception(f"{TIMEOUT_PATH} not found")
+
+    if RUN_IN_DOCKER or INSIDE_DOCKER:
+        try:
+            DockerClient = docker.from_env()
+        except docker.errors.DockerException as error:
+            if error.__str__().startswith("Error while fetching server API version"):
+                raise Exception("Cannot connect to Docker daemon, is it running ?")
+            else:
+                raise error
+
+    if INSIDE_DOCKER:
+        HOSTNAME = os.getenv("HOSTNAME", None)
+        process_id = DockerClient.api.inspect_container(HOSTNAME)["Name"].split("_")[-1]
+        judge_dir = os.path.join(os.path.abspath("evaluation"), process_id[1:])
+    else:
+        judge_dir = os.path.abspath("evaluation")
+
+    scratch_dir = os.path.abspath(SCRATCH_DIR) if SCRATCH_DIR else judge_dir
+    if INSIDE_DOCKER and not shared(scratch_dir):
+        raise Exception(f"SCRATCH_DIR must be inside {CONTAINER_DIR} when INSIDE_DOCKER is set")
+    if INSIDE_DOCKER and RUN_IN_DOCKER and SCRATCH_SIZE:
+        raise Exception("SCRATCH_SIZE is not visible to sibling containers, mount the tmpfs on the host instead")
+    mount_scratch()
+    sweep_generations()
+    new_generation()
+
+    if RESULT_STORE:
+        result_store = store.ResultStore(
+            os.getenv("RESULT_STORE_PATH", os.path.join(judge_dir, "results.db"))
+        )
+        result_store.open()
+
+    initialized = True
+
+
+def mount_scratch() -> None:
+    os.makedirs(scratch_dir, exist_ok=True)
+    if not SCRATCH_SIZE or os.path.ismount(scratch_dir):
+        return
+
+    try:
+        subprocess.run(
+            ["mount", "-t", "tmpfs", "-o", f"size={SCRATCH_SIZE}", "tmpfs", scratch_dir],
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as error:
+        logger.warning("cannot mount tmpfs on %s, using disk instead: %s", scratch_dir, error)
+
+
+def new_generation() -> None:
+    global generation_dir, execution_dir, testcases_dir, testset
+
+    if testset is not None:
+        testset.close()
+        testset = None
+
+    previous = generation_dir
+    if previous is not None:
+        governor.node.discharge(previous)
+    generation_dir = os.path.join(scratch_dir, f"gen-{uuid.uuid4().hex}")
+    execution_dir = os.path.join(generation_dir, "execution")
+    testcases_dir = os.path.join(generation_dir, "testcases")
+    os.makedirs(execution_dir)
+    os.makedirs(testcases_dir)
+
+    if previous is not None:
+        utils.remove_later(previous)
+
+
+def load_testset(content: bytes) -> utils.Testset:
+    global testset
+
+    archive = os.path.join(generation_dir, "testset.archive")
+    with open(archive, "wb") as file:
+        file.write(content)
+
+    blob = os.path.join(generation_dir, "testset.blob")
+    try:
+        loaded = utils.Testset(archive, blob).open(governor.node.available("disk"))
+        size = os.path.getsize(blob)
+        if not governor.node.charge(generation_dir, disk=size):
+            loaded.close()
+            raise utils.testset.TestsetTooLarge(f"node disk budget exhausted, {size} bytes requested")
+    except Exception:
+        if os.path.exists(blob):
+            os.remove(blob)
+        raise
+    if testset is not None:
+        testset.close()
+    testset = loaded
+    return loaded
+
+
+def testcase_exists(index: int, name: str) -> bool:
+    return os.path.exists(os.path.join(testcases_dir, str(index), name)) \
+        or (testset is not None and (index, name) in testset)
+
+
+def testcase_read(index: int, name: str) -> str:
+    path = os.path.join(testcases_dir, str(index), name)
+    if testset is None or os.path.exists(path) or (index, name) not in testset:
+        return utils.read(path)
+    return testset.read(index, name)
+
+
+def testcase_digest(index: int, *names: str) -> str:
+    paths = [os.path.join(testcases_dir, str(index), name) for name in names]
+    if testset is None or all(os.path.exists(path) for path in paths):
+        return utils.digest(*paths)
+    return testset.digest(index, *names)
+
+
+def testcase_view(index: int, name: str) -> memoryview | None:
+    if testset is None or (index, name) not in testset \
+            or os.path.exists(os.path.join(testcases_dir, str(index), name)):
+        return None
+    return testset.view(index, name)
+
+
+def shared(path: str) -> bool:
+    return os.path.commonpath([os.path.abspath(path), CONTAINER_DIR]) == CONTAINER_DIR
+
+
+def host_path(path: str) -> str:
+    if not INSIDE_DOCKER:
+        return path
+    if not shared(path):
+        raise SYSTEM_ERROR(f"{path} is outside {CONTAINER_DIR} and cannot be mounted into a sibling container")
+    return os.path.join(JUDGYSE_DIR, os.path.relpath(os.path.abspath(path), CONTAINER_DIR))
+
+
+def testcase_path(index: int, name: str, destination: str = None) -> str:
+    path = os.path.join(testcases_dir, str(index), name)
+    if testset is None or os.path.exists(path) or (index, name) not in testset:
+        if destination is not None:
+            utils.copy(path, destination)
+            return destination
+        return path
+
+    destination = destination or os.path.join(generation_dir, f".testcase_{name}")
+    testset.extract(index, name, destination)
+    return destination
+
+
+def sweep_generations() -> None:
+    for name in os.listdir(scratch_dir):
+        path = os.path.join(scratch_dir, name)
+        if name.startswith("gen-") and path != generation_dir:
+            if WIPE:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                utils.remove_later(path)
+
+
+def images() -> list[str]:
+    names = {JUDGER_IMAGE}
+    for toolchain in registry.snapshot().compilers.values():
+        for version in PREPULL_VERSIONS:
+            names.add(toolchain.image.format(version=version))
+    return sorted(names)
+
+
+def prepull(image: str) -> None:
+    DockerClient.images.pull(image)
+    DockerClient.images.get(image)
+
+
+class Tolerance(pydantic.BaseModel):
+    absolute: float = 1e-6
+    relative: float = 1e-6
+
+
+class PreviousJudge(pydantic.BaseModel):
+    manifest: dict[int, str]
+    limit: dict[str, typing.Any]
+    judge_mode: dict[str, typing.Any] | None = None
+    tolerance: Tolerance = Tolerance()
+    point: float | None = None
+    checker: str | None = None
+    code_hash: str | None = None
+    language: tuple[str, int | None] | None = None
+    compiler: tuple[str, str] | None = None
+    results: dict[int, dict[str, typing.Any]]
+
+
+class Rerun(pydantic.BaseModel):
+    band: tuple[float, float] = (0.95, 1.1)
+    count: int = 3
+    statistic: typing.Literal["min", "median"] = "median"
+
+    @pydantic.model_validator(mode="after")
+    def check(self) -> "Rerun":
+        if not 0 < self.band[0] <= self.band[1]:
+            raise ValueError("rerun band must satisfy 0 < band[0] <= band[1]")
+        if self.band[1] < 1:
+            raise ValueError("rerun band[1] must be at least 1")
+        if self.count < 1:
+            raise ValueError("rerun count must be at least 1")
+        return self
+
+
+class Options(pydantic.BaseModel):
+    reuse: bool = False
+    tolerance: Tolerance = Tolerance()
+    order: typing.Literal["index", "cost"] = "index"
+    fail_fast: bool = False
+    pure_checker: bool = False
+    rerun: Rerun | None = None
+    manifest: dict[int, str] = {}
+    previous: PreviousJudge | None = None
+
+
+def checker_digest(judge_mode: declare.JudgeMode, test_type: str) -> str | None:
+    if test_type == "interactive":
+        path = os.path.join(generation_dir, INTERACTOR_FILE)
+    elif judge_mode.mode == 1:
+        path = os.path.join(execution_dir, "judger.py")
+    else:
+        return None
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def unchanged_results(
+        options: Options,
+        limit: declare.Limit,
+        judge_mode: declare.JudgeMode,
+        point: float,
+        checker: str | None,
+        code_hash: str,
+        language: typing.Tuple[str, typing.Optional[int]],
+        compiler: typing.Tuple[str, str],
+) -> dict[int, tuple[int, int, dict[str, typing.Any]]]:
+    previous = options.previous
+    if previous is None or declare.Limit(**previous.limit) != limit:
+        return {}
+    if previous.code_hash != code_hash or previous.language != tuple(language) \
+            or previous.compiler != tuple(compiler):
+        return {}
+    if previous.judge_mode is None or declare.JudgeMode(**previous.judge_mode) != judge_mode:
+        return {}
+    if previous.point != point or previous.checker != checker:
+        return {}
+    if judge_mode.mode == 2 and previous.tolerance != options.tolerance:
+        return {}
+
+    unchanged = {}
+    for index, result in previous.results.items():
+        testcase_hash = options.manifest.get(index)
+        if testcase_hash is None or previous.manifest.get(index) != testcase_hash or "status" not in result:
+            continue
+
+        data = {key: value for key, value in result.items() if key not in ("position", "status")}
+        unchanged[index] = (index, result["status"], data)
+    return unchanged
+
+
+class Build(typing.NamedTuple):
+    source: str
+    image: str
+    execute: typing.List[str]
+    warning: str | None
+
+
+def build(
+        submission_id: str,
+        language: typing.Tuple[str, typing.Optional[int]],
+        compiler: typing.Tuple[str, typing.Union[typing.Literal["latest"], str]],
+        directory: str,
+) -> Build:
+    profiles = registry.snapshot()
+    profile = profiles.languages[language[0]]
+    code = profile.file.format(id=submission_id)
+    executable = profile.executable.format(id=submission_id)
+
+    toolchain = profiles.compilers[compiler[0]]
+    image = toolchain.image.format(version=compiler[1])
+    compile = toolchain.compile_argv(source=code, executable=executable, version=language[1])
+
+    try:
+        with governor.node.reserve(
+                cpu=1,
+                memory=mem_parse(COMPILER_MEM_LIMIT),
+                containers=int(RUN_IN_DOCKER and not INSIDE_DOCKER),
+        ):
+            if not RUN_IN_DOCKER or INSIDE_DOCKER:
+                callback = subprocess.run(
+                    compile,
+                    cwd=directory,
+                    capture_output=True,
+                    check=True,
+                    preexec_fn=utils.address_space_limit(mem_parse(COMPILER_MEM_LIMIT)) if HARD_LIMIT else None,
+                )
+                warn = callback.stdout.decode()
+
+            else:
+                warn = DockerClient.containers.run(
+                    image=image,
+                    command=compile,
+                    detach=False,
+                    stdout=True,
+                    stderr=True,
+                    volumes=[f"{directory}:/compile"],
+                    working_dir="/compile",
+                    mem_limit=COMPILER_MEM_LIMIT,
+                ).decode()
+
+    except governor.BudgetExceeded as e:
+        raise SYSTEM_ERROR(*e.args) from e
+
+    except (docker.errors.ContainerError, subprocess.CalledProcessError) as e:
+        raise COMPILE_ERROR(*e.args) from e
+
+    except docker.errors.APIError as e:
+        raise SYSTEM_ERROR(*e.args) from e
+
+    except Exception as e:
+        raise UNKNOWN_ERROR(*e.args) from e
+
+    return Build(code, image, toolchain.execute_argv(executable=executable), warn or None)
+
+
+def order_by_cost(
+        indices: typing.List[int],
+        test_file: typing.Tuple[str, str],
+        hashes: typing.Dict[int, str],
+) -> typing.List[int]:
+    for index in indices:
+        if testcase_exists(index, test_file[0]) and testcase_exists(index, test_file[1]):
+            hashes[index] = testcase_digest(index, *test_file)
+
+    stats = result_store.stats(hashes.values())
+
+    def cost(index: int) -> tuple[float, float]:
+        stat = stats.get(hashes.get(index))
+        if stat is None:
+            return -0.5, 0
+        return -stat.failure_rate, -stat.max_time
+
+    return sorted(indices, key=cost)
+
+
+def parse_statics(stderr: bytes) -> dict[str, str]:
+    statics = stderr.decode().split("--judgyse_static:")[-1][:-1]
+    return wrap([tuple(static.split("=")) for static in statics.split(",")])
+
+
+def measure(
+        argv: typing.List[str],
+        cwd: str,
+        input_file: str | None,
+        input_view: memoryview | None,
+        output_file: str,
+        timeout: float,
+) -> float | None:
+    stdin = subprocess.PIPE if input_view is not None else open(input_file or os.devnull, "rb")
+    try:
+        with open(output_file, "wb") as stdout:
+            process = subprocess.Popen(argv, cwd=cwd, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE)
+            try:
+                _, stderr = process.communicate(input_view, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                utils.kill_tree(process.pid)
+                process.communicate()
+                return timeout
+    finally:
+        if stdin is not subprocess.PIPE:
+            stdin.close()
+
+    statics = parse_statics(stderr)
+    if int(statics["return"]) != 0:
+        return None
+    return float(statics["time"])
+
+
+def rerun_sample(
+        k: int,
+        argv: typing.List[str],
+        cwd: str,
+        test_type: str,
+        test_file: typing.Tuple[str, str],
+        index: int,
+        input_file: str | None,
+        input_view: memoryview | None,
+        timeout: float,
+) -> float | None:
+    if test_type == "std":
+        return measure(argv, cwd, input_file, input_view, os.path.join(generation_dir, f".rerun_{k}"), timeout)
+
+    directory = os.path.join(generation_dir, f"rerun-{k}")
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    for name in os.listdir(execution_dir):
+        if name not in (test_file[1], STDOUT_FILE) and os.path.isfile(os.path.join(execution_dir, name)):
+            utils.copy(os.path.join(execution_dir, name), os.path.join(directory, name))
+    testcase_path(index, test_file[0], os.path.join(directory, test_file[0]))
+    return measure(argv, directory, None, None, os.path.join(directory, STDOUT_FILE), timeout)
+
+
+def rerun_samples(
+        count: int,
+        sample: typing.Callable[[int], float | None],
+        budget: dict[str, int],
+) -> typing.List[float | None]:
+    acquired = 0
+    while acquired < count - 1:
+        try:
+            governor.node.acquire(0, **budget)
+        except governor.BudgetExceeded:
+            break
+        acquired += 1
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(acquired + 1) as executor:
+            return list(executor.map(sample, range(count)))
+    finally:
+        if acquired:
+            governor.node.release(**{name: amount * acquired for name, amount in budget.items()})
+
+
+def checker_verdict(
+        verdict: typing.Any,
+        point: float,
+        feedback: typing.Callable[[], str],
+) -> tuple[int, float, str]:
+    if isinstance(verdict, bool):
+        return (
+            declare.StatusCode.ACCEPTED.value if verdict else declare.StatusCode.WRONG_ANSWER.value,
+            point if verdict else 0,
+            "Accepted :D" if verdict else feedback(),
+        )
+
+    if isinstance(verdict, dict):
+        status = verdict.get("status", None)
+        if status is None or verdict.get("point", None) is None:
+            raise JUDGER_ERROR("Invalid output from judger")
+        return status, verdict["point"], verdict.get("feedback", "Accepted :D" if status == 0 else feedback())
+
+    raise JUDGER_ERROR("Invalid output from judger")
+
+
 def thread_judge(
         submission_id: str,
         language: typing.Tuple[str, typing.Optional[int]],
         compiler: typing.Tuple[str, typing.Union[typing.Literal["latest"], str]],
         test_range: typing.Tuple[int, int],
         test_file: typing.Tuple[str, str],
-        test_type: typing.Literal["file", "std"],
+        test_type: typing.Literal["file", "std", "interactive"],
         judge_mode: declare.JudgeMode,
         limit: declare.Limit,
         point_per_testcase: float,
         abort: asyncio.Event,
-        msg_queue: queue.Queue
+        msg_queue: queue.Queue,
+        options: Options = None,
 ):
     try:
         for data in judge(submission_id,
@@ -116,7 +588,8 @@ def thread_judge(
                           judge_mode,
                           limit,
                           point_per_testcase,
-                          abort):
+                          abort,
+                          options):
             msg_queue.put(data)
 
     except ABORTED:
@@ -156,288 +629,561 @@ def judge(
         compiler: typing.Tuple[str, typing.Union[typing.Literal["latest"], str]],
         test_range: typing.Tuple[int, int],
         test_file: typing.Tuple[str, str],
-        test_type: typing.Literal["file", "std"],
+        test_type: typing.Literal["file", "std", "interactive"],
         judge_mode: declare.JudgeMode,
         limit: declare.Limit,
         point_per_testcase: float,
-        abort: asyncio.Event
+        abort: asyncio.Event,
+        options: Options = None,
 ) -> typing.Iterator[
     tuple[typing.Literal["compiler", "system"] | int, declare.StatusCode, dict[str, str | int] | None]
 ]:
-    file = declare.Language[language[0]]
-    code = file.file.format(id=submission_id)
-    executable = file.executable.format(id=submission_id)
-
-    command = declare.Compiler[compiler[0]]
-    image = command.image.format(version=compiler[1])
-    compile = command.compile.format(
-        source=code,
-        executable=executable,
-        version=language[1]
-    )
-    execute = command.execute.format(executable=executable)
-
     """
     Compile
     """
 
-    try:
-        warn: str = None
-        if not RUN_IN_DOCKER or INSIDE_DOCKER:
-            command = (
-                f"ulimit -v {mem_parse(COMPILER_MEM_LIMIT)} && {compile}"
-                if HARD_LIMIT
-                else compile
-            )
-
-            callback = subprocess.run(
-                shlex.split(command),
-                cwd=execution_dir,
-                capture_output=True,
-                check=True,
-            )
-            warn = callback.stdout.decode()
-
-        else:
-            warn: bytes = DockerClient.containers.run(
-                image=image,
-                command=compile,
-                detach=False,
-                stdout=True,
-                stderr=True,
-                volumes=[f"{execution_dir}:/compile"],
-                working_dir="/compile",
-                mem_limit=COMPILER_MEM_LIMIT,
-            )
-            warn = warn.decode()
-
-        if warn:
-            yield "compiler", "warn", {"message": warn}
-
-    except (docker.errors.ContainerError, subprocess.CalledProcessError) as e:
-        raise COMPILE_ERROR(*e.args) from e
-
-    except docker.errors.APIError as e:
-        raise SYSTEM_ERROR(*e.args) from e
-
-    except Exception as e:
-        raise UNKNOWN_ERROR(*e.args) from e
+    program = build(submission_id, language, compiler, execution_dir)
+    code, image, execute_argv = program.source, program.image, program.execute
+    execute = shlex.join(execute_argv)
+    if program.warning:
+        yield "compiler", "warn", {"message": program.warning}
 
     """
     Execute
     """
 
+    options = options or Options()
+    code_hash = utils.digest(os.path.join(execution_dir, code))
+    unchanged = unchanged_results(
+        options,
+        limit,
+        judge_mode,
+        point_per_testcase,
+        checker_digest(judge_mode, test_type) if options.previous is not None else None,
+        code_hash,
+        language,
+        compiler,
+    )
+    time_limit = calibrate.scale_limit(limit.time)
+    run_limit = time_limit * options.rerun.band[1] if options.rerun is not None else time_limit
+    if test_type == "interactive":
+        run_limit = time_limit * INTERACTIVE_WALL_FACTOR
     results: typing.List[declare.JudgeResult] = []
+    key: str = None
+    key_parts: tuple[str, str, str, str, str] = None
+    compiler_key = json.dumps([language, compiler])
+    limit_key = limit.model_dump_json() if options.rerun is None else json.dumps(
+        [limit.model_dump(), options.rerun.model_dump()]
+    )
+    mode_key = json.dumps([
+        judge_mode.model_dump(),
+        test_type,
+        test_file,
+        point_per_testcase,
+        utils.digest(os.path.join(execution_dir, "judger.py")) if judge_mode.mode == 1 else None,
+        utils.digest(os.path.join(generation_dir, INTERACTOR_FILE)) if test_type == "interactive" else None,
+        options.tolerance.model_dump() if judge_mode.mode == 2 else None,
+    ])
+    checker_hash = hashlib.sha256(mode_key.encode()).hexdigest()
 
     def save(*data: typing.Any):
         data = utils.padding(data, 3, {})
         results.append(data)
+        if result_store is not None and key is not None:
+            result_store.put(key, submission_id, key_parts, data[1], data[2])
+            if data[1] == declare.StatusCode.TIME_LIMIT_EXCEEDED.value:
+                used = limit.time
+            elif data[1] in (declare.StatusCode.RUNTIME_ERROR.value, declare.StatusCode.MEMORY_LIMIT_EXCEEDED.value):
+                used = None
+            else:
+                used = data[2].get("time", None)
+            result_store.record(testcase_hash, data[1] != declare.StatusCode.ACCEPTED.value, used)
         yield data
 
-    for i in range(test_range[0], test_range[1] + 1, 1):
-        if abort.is_set():
-            logger.debug("Aborted")
-            raise ABORTED()
+    test_budget = {"cpu": 1, "memory": mem_parse(limit.memory), "containers": int(RUN_IN_DOCKER)}
+    try:
+        governor.node.check(test_budget)
+    except governor.BudgetExceeded as error:
+        raise SYSTEM_ERROR(*error.args) from error
+
+    hashes: typing.Dict[int, str] = {}
+    indices = list(range(test_range[0], test_range[1] + 1))
+    if options.order == "cost" and result_store is not None:
+        indices = order_by_cost(indices, test_file, hashes)
+
+    command = f"{{timeout}}{execute}"
+    if RUN_IN_DOCKER:
+        command = f"{command} > {STDOUT_FILE}"
+        if test_type == "std":
+            command = f"{command} < {test_file[0]}"
 
-        time: float = -1
-        memory: tuple[int, int] = [-1, -1]
-        output = ""
-        expect = utils.read(os.path.join(testcases_dir, str(i), test_file[1]))
+    if HARD_LIMIT and (RUN_IN_DOCKER or not MEMORY_WATCHER):
+        command = f'ulimit -v {mem_parse(limit.memory) // 1024} && /bin/bash -c "{command}"'
 
-        command = f"{{timeout}}{execute}"
-        if test_type == "std":
-            command = f'cat {test_file[0]} | {execute}'
+    else:
+        command = f'/bin/bash -c "{command}"'
 
-        if HARD_LIMIT:
-            command = f'ulimit -v {mem_parse(limit.memory)} && /bin/bash -c "{command}"'
+    _execution_dir = host_path(execution_dir)
 
-        else:
-            command = f'/bin/bash -c "{command}"'
+    if RUN_IN_DOCKER:
+        command = f'/usr/bin/time --format="--judgyse_static:amemory=%K,pmemory=%M,return=%x" ' \
+                  f'{command.format(timeout="")}'
 
-        _execution_dir = execution_dir
-        _testcases_dir = testcases_dir
-        if INSIDE_DOCKER:
-            JUDGYSE_DIR = os.getenv("JUDGYSE_DIR", "/judgyse")
-            _execution_dir = os.path.join(JUDGYSE_DIR, *execution_dir.split("/")[2:])
-            _testcases_dir = os.path.join(JUDGYSE_DIR, *testcases_dir.split("/")[2:])
+    else:
+        command = \
+            f'{TIME_PATH or "/usr/bin/time"} ' \
+            f'--format="--judgyse_static:time=%e,user=%U,system=%S,amemory=%K,pmemory=%M,return=%x" ' \
+            f'{command.format(timeout=f"{TIMEOUT_PATH or "/usr/bin/timeout"} {run_limit} ")}'
+    command_argv = shlex.split(command)
 
-        if RUN_IN_DOCKER:
-            command = f'/usr/bin/time --format="--judgyse_static:amemory=%K,pmemory=%M,return=%x" ' \
-                      f'{command.format(timeout="")}'
+    zygote_runner: zygote.Zygote = None
+    zygote_script: str = None
+    if language[0] in ZYGOTE_LANGUAGES and not RUN_IN_DOCKER and test_type != "interactive":
+        zygote_runner = zygote.Zygote(execute_argv[:-1], execution_dir)
+        zygote_script = execute_argv[-1]
 
-        else:
-            command = \
-                f'{TIME_PATH or "/usr/bin/time"} --format="--judgyse_static:time=%e,amemory=%K,pmemory=%M,return=%x" ' \
-                f'{command.format(timeout=f"{TIMEOUT_PATH or "/usr/bin/timeout"} {limit.time} ")}'
+    interactor: interact.Interactor = None
+    if test_type == "interactive":
+        if RUN_IN_DOCKER:
+            raise SYSTEM_ERROR("interactive problems are not supported with RUN_IN_DOCKER")
+        interactor = interact.Interactor(
+            os.path.join(generation_dir, INTERACTOR_FILE),
+            generation_dir,
+            INTERACTOR_TIMEOUT,
+        )
 
-        try:
-            if not RUN_IN_DOCKER:
-                shutil.copyfile(
-                    os.path.join(testcases_dir, str(i), test_file[0]),
-                    os.path.join(_execution_dir, test_file[0])
-                )
-                callback = subprocess.run(
-                    shlex.split(command),
-                    cwd=_execution_dir,
-                    capture_output=True,
-                    timeout=limit.time,
-                    check=True,
+    try:
+        for i in indices:
+            if abort.is_set():
+                logger.debug("Aborted")
+                raise ABORTED()
+
+            if options.fail_fast and results and results[-1][1] != declare.StatusCode.ACCEPTED.value:
+                logger.debug(
+                    "stopping after testcase %d failed, %d left unjudged",
+                    results[-1][0],
+                    len(indices) - len(results),
                 )
-                _output = callback.stdout.decode()
-                statics = callback.stderr.decode().split('--judgyse_static:')[-1][:-1]
+                break
 
-                statics = wrap([tuple(static.split("=")) for static in statics.split(",")])
-                time = float(statics["time"])
-                memory = (int(statics["amemory"]) / 1024, int(statics["pmemory"]) / 1024)
-                if memory[1] > mem_parse(limit.memory):
-                    raise MEMORYLIMIT_EXCEEDED()
-                return_code = int(statics["return"])
+            if i in unchanged:
+                logger.debug("testcase %d is unchanged, reusing previous result", i)
+                results.append(unchanged[i])
+                yield unchanged[i]
+                continue
 
-            else:
-                container: docker.models.containers.Container = DockerClient.containers.run(
-                    image=image,
-                    command=command,
-                    detach=True,
-                    mem_limit=limit.memory,
-                    network_disabled=True,
-                    working_dir="/execution",
-                    volumes=[
-                        f"{_execution_dir}:/execution",
-                        f"{_testcases_dir}/{i}/{test_file[0]}:/execution/{test_file[0]}",
-                        *([f"{TIME_PATH}:/usr/bin/time"] if TIME_PATH else []),
-                    ]
+            testcase_hash: str = None
+            memoize = options.pure_checker and judge_mode.mode == 1 and verdict_cache.maxsize > 0
+            if result_store is not None or memoize:
+                testcase_hash = hashes.get(i) or testcase_digest(i, *test_file)
+
+            key = None
+            if result_store is not None:
+                key_parts = (
+                    code_hash,
+                    testcase_hash,
+                    compiler_key,
+                    limit_key,
+                    mode_key,
                 )
-                container.wait(timeout=limit.time)
-                inspect = DockerClient.api.inspect_container(container.id)
+                key = store.result_key(*key_parts)
+
+                if options.reuse and (cached := result_store.get(key)) is not None:
+                    logger.debug("reusing stored result for testcase %d", i)
+                    results.append((i, *cached))
+                    yield i, *cached
+                    continue
+
+            time: float = -1
+            startup: float = None
+            memory: tuple[int, int] = [-1, -1]
+            output = ""
+            interaction: dict[str, typing.Any] = None
+            samples: typing.List[float] = None
+            expect = testcase_read(i, test_file[1])
 
-                if str(inspect["State"]["OOMKilled"]).lower() == "true":
-                    raise MEMORYLIMIT_EXCEEDED()
+            try:
+                governor.node.acquire(**test_budget)
+            except governor.BudgetExceeded as error:
+                raise SYSTEM_ERROR(*error.args) from error
 
-                log = container.logs(stdout=True, stderr=True).decode("utf-8")
-                _output, statics = log.split("--judgyse_static:")
+            try:
+                if not RUN_IN_DOCKER:
+                    input_file = os.path.join(testcases_dir, str(i), test_file[0])
+                    if test_type == "file":
+                        testcase_path(i, test_file[0], os.path.join(_execution_dir, test_file[0]))
+                        if os.path.exists(os.path.join(_execution_dir, test_file[1])):
+                            os.remove(os.path.join(_execution_dir, test_file[1]))
+
+                    elif zygote_runner is not None or interactor is not None:
+                        input_file = testcase_path(i, test_file[0])
+
+                if zygote_runner is not None:
+                    watchers: typing.List[utils.MemoryWatcher] = []
+
+                    def attach(pid: int) -> None:
+                        watchers.append(utils.MemoryWatcher(pid, mem_parse(limit.memory)))
+                        watchers[-1].start()
+
+                    try:
+                        run = zygote_runner.run(
+                            os.path.join(_execution_dir, zygote_script),
+                            input_file if test_type == "std" else None,
+                            os.path.join(_execution_dir, STDOUT_FILE),
+                            time_limit,
+                            mem_parse(limit.memory) if HARD_LIMIT else None,
+                            attach if MEMORY_WATCHER else None,
+                        )
+                    finally:
+                        for watcher in watchers:
+                            watcher.stop()
+
+                    if any(watcher.exceeded for watcher in watchers):
+                        raise MEMORYLIMIT_EXCEEDED()
+                    if run["timeout"]:
+                        raise TIMELIMIT_EXCEEDED()
+
+                    _output = utils.read(os.path.join(_execution_dir, STDOUT_FILE))
+                    time = run["time"]
+                    startup = run["startup"]
+                    peak = max([run["memory"] * 1024, *(watcher.peak for watcher in watchers)])
+                    memory = (run["memory"] / 1024, peak / 1024 ** 2)
+                    if peak > mem_parse(limit.memory):
+                        raise MEMORYLIMIT_EXCEEDED()
+                    return_code = run["return"]
+
+                elif interactor is not None:
+                    to_contestant = os.pipe()
+                    from_contestant = os.pipe()
+                    watcher: utils.MemoryWatcher = None
+                    try:
+                        process = subprocess.Popen(
+                            command_argv,
+                            cwd=_execution_dir,
+                            stdin=to_contestant[0],
+                            stdout=from_contestant[1],
+                            stderr=subprocess.PIPE,
+                        )
+                        try:
+                            interactor.send(
+                                input_file,
+                                testcase_path(i, test_file[1]),
+                                to_contestant[1],
+                                from_contestant[0],
+                            )
+                        except (OSError, RuntimeError) as error:
+                            utils.kill_tree(process.pid)
+                            process.communicate()
+                            raise JUDGER_ERROR(*error.args) from error
+                    finally:
+                        for fd in (*to_contestant, *from_contestant):
+                            os.close(fd)
+
+                    try:
+                        if MEMORY_WATCHER:
+                            watcher = utils.MemoryWatcher(process.pid, mem_parse(limit.memory))
+                            watcher.start()
+                        try:
+                            _, stderr = process.communicate(timeout=run_limit)
+                        except subprocess.TimeoutExpired:
+                            utils.kill_tree(process.pid)
+                            process.communicate()
+                            raise
+                    finally:
+                        if watcher is not None:
+                            watcher.stop()
+                        try:
+                            interaction = interactor.receive()
+                        except RuntimeError as error:
+                            raise JUDGER_ERROR(*error.args) from error
+
+                    if watcher is not None and watcher.exceeded:
+                        raise MEMORYLIMIT_EXCEEDED()
+
+                    statics = parse_statics(stderr)
+                    time = float(statics["user"]) + float(statics["system"])
+                    if time > time_limit:
+                        raise TIMELIMIT_EXCEEDED()
+                    memory = (
+                        int(statics["amemory"]) / 1024,
+                        max(int(statics["pmemory"]) * 1024, watcher.peak if watcher is not None else 0) / 1024 ** 2,
+                    )
+                    if memory[1] * 1024 ** 2 > mem_parse(limit.memory):
+                        raise MEMORYLIMIT_EXCEEDED()
+                    return_code = int(statics["return"])
+                    _output = stderr.decode().split('--judgyse_static:')[0]
+
+                elif not RUN_IN_DOCKER:
+                    input_view = testcase_view(i, test_file[0]) if test_type == "std" else None
+                    if test_type == "file":
+                        stdin = subprocess.DEVNULL
+                    elif input_view is not None:
+                        stdin = subprocess.PIPE
+                    else:
+                        stdin = open(input_file, "rb")
+                    with open(os.path.join(_execution_dir, STDOUT_FILE), "wb") as stdout:
+                        watcher: utils.MemoryWatcher = None
+                        try:
+                            process = subprocess.Popen(
+                                command_argv,
+                                cwd=_execution_dir,
+                                stdin=stdin,
+                                stdout=stdout,
+                                stderr=subprocess.PIPE,
+                            )
+                            if MEMORY_WATCHER:
+                                watcher = utils.MemoryWatcher(process.pid, mem_parse(limit.memory))
+                                watcher.start()
+                            try:
+                                _, stderr = process.communicate(input_view, timeout=run_limit)
+                            except subprocess.TimeoutExpired:
+                                utils.kill_tree(process.pid)
+                                process.communicate()
+                                raise
+                        finally:
+                            if watcher is not None:
+                                watcher.stop()
+                            if stdin not in (subprocess.DEVNULL, subprocess.PIPE):
+                                stdin.close()
+
+                    if watcher is not None and watcher.exceeded:
+                        raise MEMORYLIMIT_EXCEEDED()
+
+                    _output = utils.read(os.path.join(_execution_dir, STDOUT_FILE))
+                    statics = parse_statics(stderr)
+                    time = float(statics["time"])
+                    memory = (
+                        int(statics["amemory"]) / 1024,
+                        max(int(statics["pmemory"]) * 1024, watcher.peak if watcher is not None else 0) / 1024 ** 2,
+                    )
+                    if memory[1] * 1024 ** 2 > mem_parse(limit.memory):
+                        raise MEMORYLIMIT_EXCEEDED()
+                    return_code = int(statics["return"])
+
+                    if options.rerun is not None and return_code == 0 \
+                            and time >= options.rerun.band[0] * time_limit:
+                        reruns = rerun_samples(
+                            options.rerun.count,
+                            lambda k: rerun_sample(
+                                k, command_argv, _execution_dir, test_type, test_file, i, input_file, input_view,
+                                run_limit,
+                            ),
+                            test_budget,
+                        )
+                        samples = [time, *(value for value in reruns if value is not None)]
+                        if len(samples) <= len(reruns):
+                            logger.debug("testcase %d: discarded %d failed reruns", i, len(reruns) + 1 - len(samples))
+                        time = min(samples) if options.rerun.statistic == "min" else statistics.median(samples)
+                        logger.debug("testcase %d is borderline, samples %s, using %s", i, samples, time)
+
+                    if options.rerun is not None and time > time_limit:
+                        raise TIMELIMIT_EXCEEDED({
+                            "time": calibrate.normalize(time),
+                            "samples": [calibrate.normalize(value) for value in samples] if samples else None,
+                        })
 
-                state = inspect["State"]
-                statics = wrap(
-                    [tuple(static.split("=")) for static in statics[:-1].split(",")]
-                )
+                else:
+                    container: docker.models.containers.Container = DockerClient.containers.run(
+                        image=image,
+                        command=command,
+                        detach=True,
+                        mem_limit=limit.memory,
+                        network_disabled=True,
+                        working_dir="/execution",
+                        volumes=[
+                            f"{_execution_dir}:/execution",
+                            f"{host_path(testcase_path(i, test_file[0]))}:/execution/{test_file[0]}:ro",
+                            *([f"{TIME_PATH}:/usr/bin/time"] if TIME_PATH else []),
+                        ]
+                    )
+                    container.wait(timeout=time_limit)
+                    inspect = DockerClient.api.inspect_container(container.id)
 
-                time = stt(state["FinishedAt"]) - stt(state["StartedAt"])
-                memory = (int(statics["amemory"]) / 1024, int(statics["pmemory"]) / 1024)
-                return_code = int(statics["return"])
+                    if str(inspect["State"]["OOMKilled"]).lower() == "true":
+                        raise MEMORYLIMIT_EXCEEDED()
 
-                container.remove()
+                    log = container.logs(stdout=True, stderr=True).decode("utf-8")
+                    statics = log.split("--judgyse_static:")[-1]
+                    _output = utils.read(os.path.join(execution_dir, STDOUT_FILE))
 
-            if return_code != 0:
-                raise RUNTIME_ERROR(_output)
+                    state = inspect["State"]
+                    statics = wrap(
+                        [tuple(static.split("=")) for static in statics[:-1].split(",")]
+                    )
 
-            if test_type == "file":
-                output = utils.read(os.path.join(execution_dir, test_file[1]))
+                    time = stt(state["FinishedAt"]) - stt(state["StartedAt"])
+                    memory = (int(statics["amemory"]) / 1024, int(statics["pmemory"]) / 1024)
+                    return_code = int(statics["return"])
 
-            else:
-                output = _output
+                    container.remove()
 
-        except RUNTIME_ERROR as e:
-            yield from save(i, declare.StatusCode.RUNTIME_ERROR.value, {"error": str(e.args[0])})
-            continue
+                if return_code != 0:
+                    raise RUNTIME_ERROR(utils.tail_excerpt(_output, FEEDBACK_LIMIT))
 
-        except MEMORYLIMIT_EXCEEDED:
-            yield from save(i, declare.StatusCode.MEMORY_LIMIT_EXCEEDED.value)
-            continue
+                if test_type == "file":
+                    output = utils.read(os.path.join(execution_dir, test_file[1]))
 
-        except (TIMELIMIT_EXCEEDED, subprocess.TimeoutExpired):
-            yield from save(i, declare.StatusCode.TIME_LIMIT_EXCEEDED.value)
-            continue
+                elif test_type == "std":
+                    output = _output
 
-        except requests.exceptions.ConnectionError as e:
-            if urllib3.exceptions.ReadTimeoutError in e.args:
-                yield from save(i, declare.StatusCode.TIME_LIMIT_EXCEEDED.value, str(e))
-                container.remove()
+            except RUNTIME_ERROR as e:
+                yield from save(i, declare.StatusCode.RUNTIME_ERROR.value, {"error": str(e.args[0])})
                 continue
 
-            else:
-                raise SYSTEM_ERROR(*e.args) from e
-        except subprocess.TimeoutExpired:
-            yield from save(i, declare.StatusCode.TIME_LIMIT_EXCEEDED.value)
-            continue
+            except MEMORYLIMIT_EXCEEDED:
+                yield from save(i, declare.StatusCode.MEMORY_LIMIT_EXCEEDED.value)
+                continue
+
+            except (TIMELIMIT_EXCEEDED, subprocess.TimeoutExpired) as e:
+                yield from save(
+                    i,
+                    declare.StatusCode.TIME_LIMIT_EXCEEDED.value,
+                    e.args[0] if isinstance(e, TIMELIMIT_EXCEEDED) and e.args else {},
+                )
+                continue
+
+            except requests.exceptions.ConnectionError as e:
+                if urllib3.exceptions.ReadTimeoutError in e.args:
+                    yield from save(i, declare.StatusCode.TIME_LIMIT_EXCEEDED.value, {"error": str(e)})
+                    container.remove()
+                    continue
 
-        except (
-                docker.errors.ContainerError,
-                docker.errors.APIError,
-                subprocess.CalledProcessError
-        ) as error:
-            # raise error
-            raise SYSTEM_ERROR(*error.args) from error
-
-        except Exception as e:
-            raise e from e
-            # raise UNKNOWN_ERROR(*e.args) from e
-
-        status: int = None
-        point = 0
-        feedback = None
-        if judge_mode.mode == 0:
-            a = output
-            b = expect
-            if judge_mode.trim_endl:
-                a = "\n".join([a for a in a.split("\n") if a])
-                b = "\n".join([b for b in b.split("\n") if b])
-            if judge_mode.case:
-                a = a.lower()
-                b = b.lower()
-            comp = a == b
-            point = point_per_testcase if comp else 0
-            status = declare.StatusCode.ACCEPTED.value if comp else declare.StatusCode.WRONG_ANSWER.value
-            feedback = "Accepted :D" if comp else output
-
-        elif judge_mode.mode == 1:
-            command = (f'python -c "import main from judger; '
-                       f'print(main({output}, {expect}, '
-                       f'{{"index": {i}, "point": {point_per_testcase}, "language": "{language[0]}", '
-                       f'"time": {time}, "memory": {memory}}}))"')
-            judger_output = None
-            try:
-                if RUN_IN_DOCKER:
-                    judger_output = DockerClient.containers.run(
-                        image="python:latest",
-                        command=command,
-                        detach=False,
-                        network_disabled=False,
-                        working_dir="/execution",
-                        volumes=[f"{execution_dir}:/execution"],
-                    ).decode()
                 else:
-                    judger_output = subprocess.run(
-                        command.split(),
-                        capture_output=True,
-                        check=True,
-                        cwd=execution_dir
-                    ).stdout.decode()
-
-            except (subprocess.CalledProcessError,
-                    docker.errors.ContainerError) as error:
-                raise JUDGER_ERROR(*error.args) from error
-
-            except docker.errors.APIError as error:
+                    raise SYSTEM_ERROR(*e.args) from e
+            except subprocess.TimeoutExpired:
+                yield from save(i, declare.StatusCode.TIME_LIMIT_EXCEEDED.value)
+                continue
+
+            except (
+                    docker.errors.ContainerError,
+                    docker.errors.APIError,
+                    subprocess.CalledProcessError
+            ) as error:
+                # raise error
                 raise SYSTEM_ERROR(*error.args) from error
 
-            judger_output = ast.literal_eval(judger_output)
-            if isinstance(judger_output, bool):
-                status = declare.StatusCode.ACCEPTED.value if judger_output else declare.StatusCode.WRONG_ANSWER.value
-                point = point_per_testcase if judger_output else 0
-                feedback = "Accepted :D" if judger_output else output
-
-            elif isinstance(judger_output, dict):
-                status = judger_output.get("status", None)
-                point = judger_output.get("point", None)
-                feedback = judger_output.get("feedback", "Accepted :D" if status == 0 else output)
-                if status is None or point is None:
-                    raise JUDGER_ERROR("Invalid output from judger")
-
-        yield from save(
-            i,
-            status,
-            {"time": time, "memory": memory, "point": point, "feedback": feedback},
-        )
+            except Exception as e:
+                raise e from e
+                # raise UNKNOWN_ERROR(*e.args) from e
+
+            finally:
+                governor.node.release(**test_budget)
+
+            time = calibrate.normalize(time)
+            status: int = None
+            point = 0
+            feedback = None
+            verdict_key = None
+            verdict = None
+            if memoize and interaction is None:
+                verdict_key = (testcase_hash, hashlib.sha256(output.encode()).hexdigest(), checker_hash)
+                verdict = verdict_cache.get(verdict_key)
+
+            if verdict is not None:
+                status, point, feedback = verdict
+
+            elif interaction is not None:
+                if "error" in interaction:
+                    raise JUDGER_ERROR(interaction["error"])
+                if interaction.get("broken"):
+                    status = declare.StatusCode.WRONG_ANSWER.value
+                    feedback = "Contestant closed the interaction early"
+                else:
+                    status, point, feedback = checker_verdict(
+                        interaction["verdict"],
+                        point_per_testcase,
+                        lambda: "Wrong answer",
+                    )
+
+            elif judge_mode.mode == 0:
+                a = output
+                b = expect
+                if judge_mode.trim_endl:
+                    a = "\n".join([a for a in a.split("\n") if a])
+                    b = "\n".join([b for b in b.split("\n") if b])
+                if judge_mode.case:
+                    a = a.lower()
+                    b = b.lower()
+                comp = a == b
+                point = point_per_testcase if comp else 0
+                status = declare.StatusCode.ACCEPTED.value if comp else declare.StatusCode.WRONG_ANSWER.value
+                feedback = "Accepted :D" if comp else utils.wrong_answer_feedback(
+                    output,
+                    expect,
+                    FEEDBACK_LIMIT,
+                    judge_mode.trim_endl,
+                    judge_mode.case,
+                )
+
+            elif judge_mode.mode == 2:
+                feedback = utils.numeric_feedback(
+                    output,
+                    expect,
+                    options.tolerance.absolute,
+                    options.tolerance.relative,
+                )
+                point = point_per_testcase if feedback is None else 0
+                status = declare.StatusCode.ACCEPTED.value if feedback is None else declare.StatusCode.WRONG_ANSWER.value
+                feedback = feedback or "Accepted :D"
+
+            elif judge_mode.mode == 1:
+                command = (f'python -c "import main from judger; '
+                           f'print(main({output}, {expect}, '
+                           f'{{"index": {i}, "point": {point_per_testcase}, "language": "{language[0]}", '
+                           f'"time": {time}, "memory": {memory}}}))"')
+                judger_output = None
+                try:
+                    if RUN_IN_DOCKER:
+                        judger_output = DockerClient.containers.run(
+                            image=JUDGER_IMAGE,
+                            command=command,
+                            detach=False,
+                            network_disabled=False,
+                            working_dir="/execution",
+                            volumes=[f"{execution_dir}:/execution"],
+                        ).decode()
+                    else:
+                        judger_output = subprocess.run(
+                            command.split(),
+                            capture_output=True,
+                            check=True,
+                            cwd=execution_dir
+                        ).stdout.decode()
+
+                except (subprocess.CalledProcessError,
+                        docker.errors.ContainerError) as error:
+                    raise JUDGER_ERROR(*error.args) from error
+
+                except docker.errors.APIError as error:
+                    raise SYSTEM_ERROR(*error.args) from error
+
+                status, point, feedback = checker_verdict(
+                    ast.literal_eval(judger_output),
+                    point_per_testcase,
+                    lambda: utils.wrong_answer_feedback(output, expect, FEEDBACK_LIMIT),
+                )
+
+            if verdict_key is not None and verdict is None:
+                verdict_cache.put(verdict_key, (status, point, feedback))
+
+            yield from save(
+                i,
+                status,
+                {
+                    "time": time,
+                    "startup": startup,
+                    "memory": memory,
+                    "point": point,
+                    "feedback": feedback,
+                    "samples": [calibrate.normalize(value) for value in samples] if samples else None,
+                },
+            )
+
+    finally:
+        if zygote_runner is not None:
+            zygote_runner.stop()
+        if interactor is not None:
+            interactor.stop()
 
     results.sort(reverse=True, key=lambda x: x[1])
     judge_status = results[0]
@@ -1,16 +1,25 @@
 import asyncio
+import hmac
 import logging
 import os
 from contextlib import asynccontextmanager
 
 import fastapi
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
+import calibrate
+import governor
+import judge
 import utils
 from session import SessionManager
 
 # print(os.environ)
 
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", None) or None
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PREPULL_RETRY = float(os.getenv("PREPULL_RETRY", 5))
+PREPULL_RETRY_MAX = float(os.getenv("PREPULL_RETRY_MAX", 300))
+
 session_manager = SessionManager()
 
 main_logger = logging.getLogger("judgyse.main")
@@ -33,12 +42,57 @@ fastapi_logger.handlers.clear()
 fastapi_logger.addHandler(utils.console_handler("FastAPI"))
 
 
+readiness = {"ready": False, "images": {}, "error": None}
+
+
+async def pull(images: list[str]) -> list[str]:
+    pulled = await asyncio.gather(
+        *[asyncio.to_thread(judge.prepull, image) for image in images],
+        return_exceptions=True,
+    )
+    for image, error in zip(images, pulled):
+        readiness["images"][image] = "ready" if error is None else str(error)
+        if error is not None:
+            main_logger.error("cannot pull %s: %s", image, error)
+    return [image for image, error in zip(images, pulled) if error is not None]
+
+
+async def warmup():
+    try:
+        await asyncio.to_thread(judge.init)
+
+        failed = await pull(judge.images()) if judge.RUN_IN_DOCKER else []
+
+        if calibrate.CALIBRATE:
+            await asyncio.to_thread(calibrate.calibrate)
+
+        delay = PREPULL_RETRY
+        while failed:
+            main_logger.info("retrying %d images in %.0fs", len(failed), delay)
+            await asyncio.sleep(delay)
+            failed = await pull(failed)
+            delay = min(delay * 2, PREPULL_RETRY_MAX)
+
+        readiness["ready"] = all(state == "ready" for state in readiness["images"].values())
+        main_logger.info("warmup finished, ready: %s", readiness["ready"])
+
+    except Exception as error:
+        main_logger.error("warmup failed")
+        main_logger.exception(error)
+        readiness["error"] = str(error)
+
+
 @asynccontextmanager
 async def lifespan(app: fastapi.FastAPI):
+    warmup_task = asyncio.create_task(warmup())
     yield
+    warmup_task.cancel()
     if session_manager.status.status != 'disconnect':
         session_manager.stop_recv.set()
         await session_manager.disconnect()
+    if judge.result_store is not None:
+        judge.result_store.close()
+    utils.logging.stop_listener()
 
 
 app = fastapi.FastAPI(
@@ -50,6 +104,9 @@ app = fastapi.FastAPI(
 @app.websocket("/session")
 async def session(ws: fastapi.WebSocket):
     await ws.accept()
+    if not readiness["ready"]:
+        main_logger.debug("not ready")
+        return await ws.close(fastapi.status.WS_1013_TRY_AGAIN_LATER, "warming up")
     if session_manager.status.status != "disconnect":
         main_logger.debug("busy")
         return await ws.close(fastapi.status.WS_1013_TRY_AGAIN_LATER, "busy")
@@ -60,7 +117,47 @@ async def session(ws: fastapi.WebSocket):
 @app.get("/status", tags=["status"])
 async def status(response: HTMLResponse):
     if session_manager != "disconnect":
-        return {"status": session_manager.status}
+        return {
+            "status": session_manager.status,
+            "speed": calibrate.info(),
+            "verdict_cache": judge.verdict_cache.stats(),
+            "governor": governor.node.snapshot(),
+        }
     else:
         response.status_code = fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
         return "no session is running"
+
+
+@app.get("/ready", tags=["status"])
+async def ready(response: HTMLResponse):
+    if not readiness["ready"]:
+        response.status_code = fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness
+
+
+@app.get("/debug/profile", tags=["debug"])
+async def profile(
+        seconds: float = 5,
+        authorization: str | None = fastapi.Header(None),
+):
+    if DEBUG_TOKEN is None:
+        raise fastapi.HTTPException(fastapi.status.HTTP_404_NOT_FOUND)
+    scheme, _, supplied = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not supplied or not hmac.compare_digest(supplied.encode(), DEBUG_TOKEN.encode()):
+        raise fastapi.HTTPException(fastapi.status.HTTP_403_FORBIDDEN)
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise fastapi.HTTPException(
+            fastapi.status.HTTP_400_BAD_REQUEST,
+            f"seconds must be in (0, {PROFILE_MAX_SECONDS}]",
+        )
+
+    try:
+        stacks, rounds = await asyncio.to_thread(utils.profile.sample, seconds)
+    except RuntimeError as error:
+        raise fastapi.HTTPException(fastapi.status.HTTP_409_CONFLICT, str(error))
+
+    main_logger.info("profiled %.1fs, %d samples", seconds, rounds)
+    return PlainTextResponse(
+        utils.profile.collapse(stacks),
+        headers={"X-Profile-Samples": str(rounds), "X-Profile-Interval": str(utils.profile.PROFILE_INTERVAL)},
+    )
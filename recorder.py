@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+import typing
+import uuid
+
+import utils
+
+__all__ = [
+    "RECORD_DIR",
+    "Recorder",
+    "read",
+]
+
+RECORD_DIR = os.getenv("RECORD_DIR", None)
+RECORD_BLOB_SIZE = int(os.getenv("RECORD_BLOB_SIZE", 256))
+
+logger = logging.getLogger("judgyse.recorder")
+logger.addHandler(utils.console_handler("Recorder"))
+
+
+class Recorder:
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"session-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+        self.file = gzip.open(self.path, "wt", encoding="utf-8")
+        self.blobs: typing.Set[str] = set()
+        self.start = time.monotonic()
+        self.write({"version": 1, "created_at": time.time()})
+
+    def write(self, entry: typing.Dict[str, typing.Any]) -> None:
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def pack(self, value: typing.Any) -> typing.Any:
+        if isinstance(value, str) and len(value) >= RECORD_BLOB_SIZE:
+            key = hashlib.sha256(value.encode()).hexdigest()
+            if key not in self.blobs:
+                self.blobs.add(key)
+                self.write({"blob": key, "data": value})
+            return {"$blob": key}
+        if isinstance(value, (list, tuple)):
+            return [self.pack(item) for item in value]
+        if isinstance(value, dict):
+            return {name: self.pack(item) for name, item in value.items()}
+        return value
+
+    def record(self, direction: typing.Literal["in", "out"], message: typing.Any) -> None:
+        if self.file is None:
+            return
+        self.write({"t": round(time.monotonic() - self.start, 6), "dir": direction, "message": self.pack(message)})
+
+    def inbound(self, message: typing.Any) -> None:
+        self.record("in", message)
+
+    def outbound(self, message: typing.Any) -> None:
+        self.record("out", message)
+
+    def close(self) -> None:
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        logger.info("recorded session to %s", self.path)
+
+
+def read(path: str) -> typing.Iterator[typing.Tuple[float, str, typing.Any]]:
+    blobs: typing.Dict[str, str] = {}
+
+    def unpack(value: typing.Any) -> typing.Any:
+        if isinstance(value, dict):
+            if "$blob" in value and len(value) == 1:
+                return blobs[value["$blob"]]
+            return {name: unpack(item) for name, item in value.items()}
+        if isinstance(value, list):
+            return [unpack(item) for item in value]
+        return value
+
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            entry = json.loads(line)
+            if "blob" in entry:
+                blobs[entry["blob"]] = entry["data"]
+            elif "dir" in entry:
+                yield entry["t"], entry["dir"], unpack(entry["message"])
@@ -0,0 +1,137 @@
+import dataclasses
+import shlex
+import string
+import threading
+import typing
+
+import declare
+import exception
+
+__all__ = [
+    "LanguageProfile",
+    "CompilerProfile",
+    "Registry",
+    "snapshot",
+    "stage_languages",
+    "stage_compilers",
+    "load",
+]
+
+LANGUAGE_FIELDS = {"id"}
+IMAGE_FIELDS = {"version"}
+COMPILE_FIELDS = {"source", "executable", "version"}
+EXECUTE_FIELDS = {"executable"}
+
+
+def field(entry: typing.Any, name: str) -> str:
+    value = entry.get(name) if isinstance(entry, dict) else getattr(entry, name, None)
+    if not isinstance(value, str):
+        raise exception.InvalidField((name, "str", type(value)))
+    return value
+
+
+def validate(where: str, template: str, allowed: typing.Set[str]) -> str:
+    try:
+        names = {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+    except ValueError as error:
+        raise exception.InvalidField((where, "format string", str(error))) from error
+
+    if not names <= allowed:
+        raise exception.InvalidField((where, f"placeholders {sorted(allowed)}", sorted(names - allowed)))
+    return template
+
+
+def tokenize(where: str, template: str, allowed: typing.Set[str]) -> typing.Tuple[str, ...]:
+    validate(where, template, allowed)
+    try:
+        return tuple(shlex.split(template))
+    except ValueError as error:
+        raise exception.InvalidField((where, "shell command", str(error))) from error
+
+
+@dataclasses.dataclass(frozen=True)
+class LanguageProfile:
+    name: str
+    file: str
+    executable: str
+
+    @classmethod
+    def build(cls, name: str, entry: typing.Any) -> "LanguageProfile":
+        return cls(
+            name=name,
+            file=validate(f"language.{name}.file", field(entry, "file"), LANGUAGE_FIELDS),
+            executable=validate(f"language.{name}.executable", field(entry, "executable"), LANGUAGE_FIELDS),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class CompilerProfile:
+    name: str
+    image: str
+    compile: typing.Tuple[str, ...]
+    execute: typing.Tuple[str, ...]
+
+    @classmethod
+    def build(cls, name: str, entry: typing.Any) -> "CompilerProfile":
+        return cls(
+            name=name,
+            image=validate(f"compiler.{name}.image", field(entry, "image"), IMAGE_FIELDS),
+            compile=tokenize(f"compiler.{name}.compile", field(entry, "compile"), COMPILE_FIELDS),
+            execute=tokenize(f"compiler.{name}.execute", field(entry, "execute"), EXECUTE_FIELDS),
+        )
+
+    def compile_argv(self, source: str, executable: str, version: typing.Any) -> typing.List[str]:
+        return [token.format(source=source, executable=executable, version=version) for token in self.compile]
+
+    def execute_argv(self, executable: str) -> typing.List[str]:
+        return [token.format(executable=executable) for token in self.execute]
+
+
+@dataclasses.dataclass(frozen=True)
+class Registry:
+    languages: typing.Mapping[str, LanguageProfile]
+    compilers: typing.Mapping[str, CompilerProfile]
+
+    @classmethod
+    def build(cls, languages: typing.Mapping[str, typing.Any], compilers: typing.Mapping[str, typing.Any]) -> "Registry":
+        return cls(
+            languages={name: LanguageProfile.build(name, entry) for name, entry in languages.items()},
+            compilers={name: CompilerProfile.build(name, entry) for name, entry in compilers.items()},
+        )
+
+
+current: Registry = Registry.build(declare.Language, declare.Compiler)
+staged: typing.Dict[str, typing.Mapping[str, typing.Any]] = {}
+lock = threading.Lock()
+
+
+def snapshot() -> Registry:
+    return current
+
+
+def stage_languages(data: typing.Mapping[str, typing.Any]) -> None:
+    with lock:
+        staged["languages"] = data
+
+
+def stage_compilers(data: typing.Mapping[str, typing.Any]) -> None:
+    with lock:
+        staged["compilers"] = data
+
+
+def load() -> Registry:
+    global current
+
+    with lock:
+        languages = staged.pop("languages", None)
+        compilers = staged.pop("compilers", None)
+        registry = Registry(
+            languages=current.languages if languages is None else {
+                name: LanguageProfile.build(name, entry) for name, entry in languages.items()
+            },
+            compilers=current.compilers if compilers is None else {
+                name: CompilerProfile.build(name, entry) for name, entry in compilers.items()
+            },
+        )
+        current = registry
+    return registry
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+import typing
+
+import click
+import websockets
+
+import recorder
+
+__all__ = [
+    "steps",
+    "replay",
+    "compare",
+]
+
+
+def steps(path: str) -> typing.List[typing.Tuple[float, typing.Any, typing.List[typing.Tuple[float, typing.Any]]]]:
+    result = []
+    for timestamp, direction, message in recorder.read(path):
+        if direction == "in":
+            result.append((timestamp, message, []))
+        elif result:
+            result[-1][2].append((timestamp, message))
+    return result
+
+
+def results(messages: typing.Iterable[typing.Any]) -> typing.Dict[int, typing.Dict[str, typing.Any]]:
+    return {
+        message[1]["position"]: message[1]
+        for message in messages
+        if isinstance(message, list) and message and message[0] == "judge.result"
+    }
+
+
+async def replay(url: str, path: str, timeout: float) -> typing.Tuple[list, list, float, float]:
+    recorded: typing.List[typing.Any] = []
+    replayed: typing.List[typing.Any] = []
+    recorded_time = 0
+    replayed_time = 0
+    async with websockets.connect(url, max_size=None) as ws:
+        for sent, message, expected in steps(path):
+            started = time.monotonic()
+            await ws.send(json.dumps(message))
+            for _ in expected:
+                try:
+                    replayed.append(json.loads(await asyncio.wait_for(ws.recv(), timeout)))
+                except asyncio.TimeoutError:
+                    click.echo(f"timed out waiting for a reply to {message[0]}", err=True)
+                    break
+            if message and message[0] == "command.judge" and expected:
+                replayed_time += time.monotonic() - started
+                recorded_time += expected[-1][0] - sent
+            recorded.extend(reply for _, reply in expected)
+    return recorded, replayed, recorded_time, replayed_time
+
+
+def compare(
+        recorded: typing.List[typing.Any],
+        replayed: typing.List[typing.Any],
+) -> typing.Tuple[typing.List[str], typing.List[typing.Tuple[int, float | None, float | None]]]:
+    before = results(recorded)
+    after = results(replayed)
+    mismatches = []
+    timings = []
+    for position in sorted(set(before) | set(after)):
+        old = before.get(position, {})
+        new = after.get(position, {})
+        if old.get("status") != new.get("status"):
+            mismatches.append(f"test {position}: status {old.get('status')} -> {new.get('status')}")
+        timings.append((position, old.get("time"), new.get("time")))
+    return mismatches, timings
+
+
+@click.command()
+@click.argument("path")
+@click.option("--url", default="ws://127.0.0.1:8080/session", show_default=True, help="judge session endpoint")
+@click.option("--timeout", default=60.0, show_default=True, help="seconds to wait for each reply")
+def main(path: str, url: str, timeout: float) -> None:
+    recorded, replayed, recorded_time, replayed_time = asyncio.run(replay(url, path, timeout))
+    mismatches, timings = compare(recorded, replayed)
+
+    click.echo(f"{'test':>6} {'recorded':>10} {'replayed':>10} {'delta':>10}")
+    for position, old, new in timings:
+        delta = f"{new - old:+.3f}" if old is not None and new is not None else "-"
+        click.echo(
+            f"{position:>6} "
+            f"{old if old is not None else '-':>10} "
+            f"{new if new is not None else '-':>10} "
+            f"{delta:>10}"
+        )
+    click.echo(f"judge wall time: recorded {recorded_time:.3f}s, replayed {replayed_time:.3f}s")
+
+    for mismatch in mismatches:
+        click.echo(click.style(mismatch, fg="bright_red"))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
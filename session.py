@@ -1,23 +1,34 @@
 import asyncio
+import base64
 import json
 import logging
 import os
+import tarfile
 import typing
 import threading
+import zipfile
 
 import fastapi
+import pydantic
 
+import coordinator
 import declare
 import exception
+import generate
+import governor
 import judge
+import recorder
+import registry
 import utils
-from declare import JudgeSession, Language
+from declare import JudgeSession
 
 # import zlib
 
 Status = typing.Literal["busy", "idle", "disconnect"]
 HEARTBEAT_INTERVAL = os.getenv("HEARTBEAT_INTERVAL", 3)
 MSG_TIMEOUT = os.getenv("MSG_TIMEOUT", 5)
+MESSAGE_QUEUE_SIZE = int(os.getenv("MESSAGE_QUEUE_SIZE", 64))
+RESULT_EXTRA_FIELDS = ("startup", "samples")
 
 
 class SessionManager:
@@ -25,10 +36,12 @@ class SessionManager:
     ws: fastapi.WebSocket = None
     status: declare.Status = declare.Status(status="disconnect")
     session: JudgeSession
+    options: judge.Options = judge.Options()
     judge_abort: asyncio.Event = None  # noqa
-    messages: asyncio.Queue = asyncio.Queue()
+    messages: asyncio.Queue = asyncio.Queue(MESSAGE_QUEUE_SIZE)
     stop_recv: asyncio.Event = asyncio.Event()
     judge_thread: threading.Thread = None
+    recording: recorder.Recorder = None
 
     def __init__(self) -> None:
         self.logger = logging.getLogger("judgyse.session")
@@ -39,6 +52,8 @@ class SessionManager:
         self.ws = ws
         self.clear()
         self.stop_recv.clear()
+        if recorder.RECORD_DIR:
+            self.recording = recorder.Recorder(recorder.RECORD_DIR)
 
     def clear(self, status: Status = "idle"):
         if self.judge_abort:
@@ -46,6 +61,7 @@ class SessionManager:
 
         self.status = declare.Status(status=status)
         self.session = {}
+        self.options = judge.Options()
         self.judge_abort = None
 
     async def disconnect(self, reason: tuple[int, str | None] = (1000,)) -> None:
@@ -57,12 +73,17 @@ class SessionManager:
                 self.logger.error(error)
 
         self.clear("disconnect")
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
         self.logger.info("Disconnected")
 
     async def send(self, data: typing.Any):
         await asyncio.sleep(0)
         await self.ws.send_json(data)
-        self.logger.debug(f"sent {data}")
+        if self.recording is not None:
+            self.recording.outbound(data)
+        self.logger.debug("sent %s", data)
 
     async def is_alive(self):
         while True:
@@ -76,7 +97,7 @@ class SessionManager:
 
     async def recv(self):
         try:
-            async for message in self.ws.iter_json():
+            async for text in self.ws.iter_text():
                 if self.stop_recv.is_set():
                     self.logger.info("stop recv")
                     break
@@ -86,6 +107,10 @@ class SessionManager:
                 command: str
                 data: typing.Any
 
+                message = json.loads(text)
+                if self.recording is not None:
+                    self.recording.inbound(message)
+
                 command, data = utils.padding(message, 2)
                 try:
                     data = json.loads(data)
@@ -99,15 +124,33 @@ class SessionManager:
                 #     await self.send(["pong", data])
 
                 elif command.startswith("command."):
-                    await self.handle(command[8:], data)
+                    # admission control only: the frame is already in memory, its size is bounded by ws_max_size
+                    try:
+                        await governor.node.acquire_async(memory=len(text))
+                    except governor.BudgetExceeded as error:
+                        await self.send(["judge.error:system", str(error)])
+                        continue
+                    try:
+                        await self.handle(command[8:], data)
+                    finally:
+                        governor.node.release(memory=len(text))
 
                 elif command.startswith("declare."):
                     if data is not None and len(data) > 0:
                         data = json.loads(data[0])
-                    self.declare(command[8:], data)
+                    try:
+                        self.declare(command[8:], data)
+                    except exception.InvalidField as error:
+                        await self.send(["declare.error",
+                                         {"status": 1, "code": "invalid_field",
+                                          "error": f"invalid field {error.args[0][0]}: "
+                                                   f"expected {error.args[0][1]}, got {error.args[0][2]}"}])
 
                 else:
-                    await self.messages.put([command, data])
+                    if self.messages.full():
+                        dropped = self.messages.get_nowait()
+                        self.logger.warning("message queue is full, dropping %s", dropped[0])
+                    self.messages.put_nowait([command, data])
 
         except fastapi.websockets.WebSocketDisconnect:
             return await self.disconnect()
@@ -142,13 +185,13 @@ class SessionManager:
                 os.environ.update(data)
 
             case "language":
-                utils.write_json(declare.judge.language_json, data)
+                registry.stage_languages(data)
 
             case "compiler":
-                utils.write_json(declare.judge.compiler_json, data)
+                registry.stage_compilers(data)
 
             case "load":
-                declare.judge.load()
+                registry.load()
 
     async def handle(self, command: str, parsed: typing.Any) -> None:
         match command:
@@ -156,8 +199,7 @@ class SessionManager:
                 self.status = declare.Status(status="busy")
                 self.session: declare = {}
                 self.judge_abort = asyncio.Event()
-                utils.wipe_data(judge.execution_dir)
-                utils.wipe_data(judge.testcases_dir)
+                judge.new_generation()
 
             case "init":
                 await self.parse_session(parsed)
@@ -169,13 +211,31 @@ class SessionManager:
             case "judger":
                 await self.write_judger(parsed)
 
+            case "interactor":
+                await self.write_interactor(parsed)
+
             case "testcase":
                 await self.write_testcase(parsed)
 
+            case "testset":
+                await self.write_testset(parsed)
+
+            case "generator":
+                await self.write_generator(parsed)
+
             case "judge":
                 # async def job():
                 try:
-                    for position, status, data in judge.judge(
+                    if coordinator.enabled:
+                        async for position, status, data in coordinator.dispatch(
+                                self.session,
+                                self.options,
+                                self.judge_abort,
+                        ):
+                            await self.report(position, status, data)
+
+                    else:
+                        results = judge.judge(
                             self.session.submission_id,
                             self.session.language,
                             self.session.compiler,
@@ -186,32 +246,11 @@ class SessionManager:
                             self.session.limit,
                             self.session.point,
                             self.judge_abort,
-                    ):
-                        if position == "compiler":
-                            await self.send([
-                                "judge.compiler",
-                                str(data.get("message")),
-                            ])
-
-                        elif position == "overall":
-                            await self.send(["judge.overall", status])
-
-                        elif isinstance(position, int):
-                            self.status = declare.Status(status="busy", progress=position.__str__())
-                            # self.logger.debug(data)
-                            await self.send(["judge.result", declare.JudgeResult(
-                                position=position,
-                                status=status,
-                                error=data.get("error", None),
-                                time=data.get("time", None),
-                                memory=data.get("memory", None),
-                                point=data.get("point", None),
-                                feedback=data.get("feedback", None),
-                            ).model_dump()])
-
-                        else:
-                            self.logger.error(f"unknown position: {position}")
-                            self.logger.error(f"{position} {status} {data}")
+                            self.options,
+                        )
+                        while (item := await asyncio.to_thread(next, results, None)) is not None:
+                            position, status, data = item
+                            await self.report(position, status, data)
 
                 except exception.ABORTED:
                     self.logger.info("judge aborted")
@@ -312,6 +351,37 @@ class SessionManager:
             case _:
                 raise exception.CommandNotFound(f"unknown command: {command}")
 
+    async def report(self, position: str | int, status: typing.Any, data: dict[str, typing.Any]) -> None:
+        if position == "compiler":
+            await self.send([
+                "judge.compiler",
+                str(data.get("message")),
+            ])
+
+        elif position == "overall":
+            await self.send(["judge.overall", status])
+
+        elif isinstance(position, int):
+            self.status = declare.Status(status="busy", progress=position.__str__())
+            # self.logger.debug(data)
+            result = declare.JudgeResult(
+                position=position,
+                status=status,
+                error=data.get("error", None),
+                time=data.get("time", None),
+                memory=data.get("memory", None),
+                point=data.get("point", None),
+                feedback=data.get("feedback", None),
+            ).model_dump()
+            for field in RESULT_EXTRA_FIELDS:
+                if data.get(field, None) is not None:
+                    result[field] = data[field]
+            await self.send(["judge.result", result])
+
+        else:
+            self.logger.error("unknown position: %s", position)
+            self.logger.error("%s %s %s", position, status, data)
+
     async def parse_session(self, data: typing.Dict[str, typing.Any]) -> None:
         strict, optional = utils.get_fields(JudgeSession)
 
@@ -328,6 +398,7 @@ class SessionManager:
         judge_mode = data["judge_mode"]
         limit = data["limit"]
         point = data["point"]
+        options = data.get("options", {})
 
         if not isinstance(submission_id, str):
             raise exception.InvalidField("submission_id", "str", type(submission_id))
@@ -341,14 +412,23 @@ class SessionManager:
             raise exception.InvalidField("test_file", "list(2)", type(test_file))
         if not isinstance(test_type, str):
             raise exception.InvalidField("test_type", "str", type(test_type))
-        if test_type not in ["file", "std"]:
-            raise exception.InvalidField("test_type", "file, std", test_type)
+        if test_type not in ["file", "std", "interactive"]:
+            raise exception.InvalidField("test_type", "file, std, interactive", test_type)
         if not isinstance(judge_mode, dict):
             raise exception.InvalidField("judge_mode", "dict", type(judge_mode))
         if not isinstance(limit, dict):
             raise exception.InvalidField("limit", "dict", type(limit))
         if not isinstance(point, float):
             raise exception.InvalidField("point", "float", type(point))
+        if not isinstance(options, dict):
+            raise exception.InvalidField("options", "dict", type(options))
+        for field in ("absolute", "relative"):
+            if field in judge_mode and not isinstance(judge_mode[field], (int, float)):
+                raise exception.InvalidField(f"judge_mode.{field}", "float", type(judge_mode[field]))
+        if "tolerance" not in options:
+            options["tolerance"] = {
+                field: judge_mode[field] for field in ("absolute", "relative") if field in judge_mode
+            }
 
         self.session = JudgeSession(
             submission_id=submission_id,
@@ -361,9 +441,18 @@ class SessionManager:
             limit=declare.Limit(**limit),
             point=point,
         )
+        self.options = judge.Options(**options)
 
         await self.send(["judge.init", {"status": 0}])
 
+    async def reserve_disk(self, reply: str, size: int) -> bool:
+        if governor.node.charge(judge.generation_dir, disk=size):
+            return True
+
+        await self.send([reply, {"status": 1, "code": "disk_budget",
+                                 "error": f"node disk budget exhausted, {size} bytes requested"}])
+        return False
+
     async def write_testcase(self, data: typing.Tuple[int, str, str, bool]) -> None:
         if data[0] not in range(
                 self.session.test_range[0],
@@ -371,9 +460,6 @@ class SessionManager:
         ):
             raise exception.InvalidTestcaseIndex(data[0])
 
-        if not os.path.exists(os.path.join(judge.testcases_dir, str(data[0]))):
-            os.makedirs(os.path.join(judge.testcases_dir, str(data[0])))
-
         input_content = data[1]
         output_content = data[2]
         # compressed = data[3]
@@ -381,25 +467,73 @@ class SessionManager:
         #     input_content = zlib.decompress(input_content)
         #     output_content = zlib.decompress(output_content)
 
-        utils.write(
-            os.path.join(judge.testcases_dir, str(data[0]), self.session.test_file[0]),
-            input_content,
-        )
-        utils.write(
-            os.path.join(judge.testcases_dir, str(data[0]), self.session.test_file[1]),
-            output_content,
-        )
+        if not await self.reserve_disk("judge.write:testcase", len(input_content) + len(output_content)):
+            return
+
+        def write() -> None:
+            os.makedirs(os.path.join(judge.testcases_dir, str(data[0])), exist_ok=True)
+            utils.write(
+                os.path.join(judge.testcases_dir, str(data[0]), self.session.test_file[0]),
+                input_content,
+            )
+            utils.write(
+                os.path.join(judge.testcases_dir, str(data[0]), self.session.test_file[1]),
+                output_content,
+            )
+
+        await asyncio.to_thread(write)
         await self.send(["judge.write:testcase", {"status": 0, "index": data[0]}])
 
+    async def write_testset(self, data: typing.Tuple[str, bool]) -> None:
+        content = base64.b64decode(data[0])
+        if not await self.reserve_disk("judge.write:testset", len(content)):
+            return
+
+        try:
+            testset = await asyncio.to_thread(judge.load_testset, content)
+        except utils.testset.TestsetTooLarge as error:
+            await self.send(["judge.write:testset", {"status": 1, "code": "disk_budget", "error": str(error)}])
+            return
+        except (ValueError, tarfile.TarError, zipfile.BadZipFile) as error:
+            await self.send(["judge.write:testset", {"status": 1, "code": "invalid_testset", "error": str(error)}])
+            return
+
+        self.logger.debug("received testset: %d files, %d bytes", len(testset), len(content))
+        await self.send(["judge.write:testset", {"status": 0, "count": len(testset.indices())}])
+
+    async def write_generator(self, data: typing.Dict[str, typing.Any]) -> None:
+        try:
+            request = generate.Request.model_validate(data)
+        except pydantic.ValidationError as error:
+            await self.send(["judge.write:generator", {"status": 1, "code": "invalid_field", "error": str(error)}])
+            return
+
+        for index in request.tests:
+            if index not in range(self.session.test_range[0], self.session.test_range[1] + 1):
+                raise exception.InvalidTestcaseIndex(index)
+
+        try:
+            count = await asyncio.to_thread(generate.generate, request, self.session.test_file)
+        except exception.COMPILE_ERROR as error:
+            await self.send(["judge.write:generator", {"status": 1, "code": "compile_error", "error": str(error)}])
+        except exception.GENERATOR_ERROR as error:
+            await self.send(["judge.write:generator", {"status": 1, "code": "generator_error", "error": str(error)}])
+        except exception.SYSTEM_ERROR as error:
+            await self.send(["judge.write:generator", {"status": 1, "code": "system_error", "error": str(error)}])
+        except exception.UNKNOWN_ERROR as error:
+            await self.send(["judge.write:generator", {"status": 1, "code": "unknown_error", "error": str(error)}])
+        else:
+            await self.send(["judge.write:generator", {"status": 0, "count": count}])
+
     async def write_code(self, data: typing.Tuple[str, bool]) -> None:
-        file_name = Language[self.session.language[0]].file.format(
+        file_name = registry.snapshot().languages[self.session.language[0]].file.format(
             id=self.session.submission_id
         )
         file_content = data[0]
         # compressed = data[1]
         # if compressed:
         #     file_content = zlib.decompress(file_content)
-        self.logger.debug(file_content)
+        self.logger.debug("received code: %s (%d characters)", file_name, len(file_content))
         utils.write(os.path.join(judge.execution_dir, file_name), file_content)
 
         await self.send(["judge.write:code", {"status": 0}])
@@ -412,3 +546,9 @@ class SessionManager:
         utils.write(os.path.join(judge.execution_dir, "judger.py"), file_content)
 
         await self.send(["judge.write:judger", {"status": 0}])
+
+    async def write_interactor(self, data: typing.Tuple[str, bool]) -> None:
+        file_content = data[0]
+        utils.write(os.path.join(judge.generation_dir, judge.INTERACTOR_FILE), file_content)
+
+        await self.send(["judge.write:interactor", {"status": 0}])
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import typing
+
+import sqlalchemy
+import sqlalchemy.exc
+import sqlmodel
+
+import utils
+
+__all__ = [
+    "ResultRecord",
+    "TestStat",
+    "ResultStore",
+    "result_key",
+]
+
+STORE_BATCH = int(os.getenv("STORE_BATCH", 64))
+STORE_FLUSH_INTERVAL = float(os.getenv("STORE_FLUSH_INTERVAL", 1))
+STAT_QUERY_CHUNK = 500
+
+logger = logging.getLogger("judgyse.store")
+logger.addHandler(utils.console_handler("Store"))
+
+
+class ResultRecord(sqlmodel.SQLModel, table=True):
+    __tablename__ = "result"
+
+    key: str = sqlmodel.Field(primary_key=True)
+    submission_id: str = sqlmodel.Field(index=True)
+    code_hash: str = sqlmodel.Field(index=True)
+    testcase_hash: str = sqlmodel.Field(index=True)
+    compiler: str
+    limit: str
+    mode: str
+    status: int
+    data: str
+    created_at: float
+
+
+class TestStat(sqlmodel.SQLModel, table=True):
+    __tablename__ = "test_stat"
+
+    testcase_hash: str = sqlmodel.Field(primary_key=True)
+    runs: int = 0
+    failures: int = 0
+    timed: int = 0
+    total_time: float = 0
+    max_time: float = 0
+    updated_at: float = 0
+
+    @property
+    def failure_rate(self) -> float:
+        return (self.failures + 1) / (self.runs + 2)
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.timed if self.timed else 0
+
+
+class StatUpdate(typing.NamedTuple):
+    testcase_hash: str
+    failed: bool
+    time: float | None
+
+
+def result_key(
+        code_hash: str,
+        testcase_hash: str,
+        compiler: str,
+        limit: str,
+        mode: str,
+) -> str:
+    return hashlib.sha256(
+        json.dumps([code_hash, testcase_hash, compiler, limit, mode]).encode()
+    ).hexdigest()
+
+
+class ResultStore:
+    path: str
+    engine: sqlalchemy.Engine = None
+    writes: queue.Queue
+    pending: dict[str, ResultRecord]
+    lock: threading.Lock
+    writer: threading.Thread = None
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.writes = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def open(self) -> None:
+        if self.engine is not None:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.engine = sqlmodel.create_engine(
+            f"sqlite:///{self.path}",
+            connect_args={"check_same_thread": False},
+        )
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        sqlmodel.SQLModel.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(test_stat)")}
+            if "timed" not in columns:
+                connection.exec_driver_sql("ALTER TABLE test_stat ADD COLUMN timed INTEGER NOT NULL DEFAULT 0")
+                connection.exec_driver_sql("UPDATE test_stat SET timed = runs")
+
+        self.writer = threading.Thread(target=self.write_loop, name="result-store", daemon=True)
+        self.writer.start()
+
+    def close(self) -> None:
+        if self.writer is None:
+            return
+
+        self.writes.put(None)
+        self.writer.join()
+        self.writer = None
+        self.engine.dispose()
+        self.engine = None
+        self.writes = queue.Queue()
+        with self.lock:
+            self.pending.clear()
+
+    def put(
+            self,
+            key: str,
+            submission_id: str,
+            parts: typing.Tuple[str, str, str, str, str],
+            status: int,
+            data: dict[str, typing.Any],
+    ) -> None:
+        self.open()
+        code_hash, testcase_hash, compiler, limit, mode = parts
+        record = ResultRecord(
+            key=key,
+            submission_id=submission_id,
+            code_hash=code_hash,
+            testcase_hash=testcase_hash,
+            compiler=compiler,
+            limit=limit,
+            mode=mode,
+            status=status,
+            data=json.dumps(data),
+            created_at=time.time(),
+        )
+        with self.lock:
+            self.pending[key] = record
+        self.writes.put(record)
+
+    def get(self, key: str) -> typing.Tuple[int, dict[str, typing.Any]] | None:
+        self.open()
+        with self.lock:
+            record = self.pending.get(key)
+
+        if record is None:
+            with sqlmodel.Session(self.engine) as session:
+                record = session.get(ResultRecord, key)
+
+        if record is None:
+            return None
+        return record.status, json.loads(record.data)
+
+    def record(self, testcase_hash: str, failed: bool, time_used: float | None) -> None:
+        self.open()
+        self.writes.put(StatUpdate(testcase_hash, failed, None if time_used is None else max(time_used, 0)))
+
+    def stats(self, hashes: typing.Iterable[str]) -> dict[str, TestStat]:
+        self.open()
+        hashes = list(set(hashes))
+        result: dict[str, TestStat] = {}
+        with sqlmodel.Session(self.engine) as session:
+            for offset in range(0, len(hashes), STAT_QUERY_CHUNK):
+                chunk = hashes[offset:offset + STAT_QUERY_CHUNK]
+                statement = sqlmodel.select(TestStat).where(TestStat.testcase_hash.in_(chunk))
+                for stat in session.exec(statement):
+                    result[stat.testcase_hash] = stat
+        return result
+
+    def write_loop(self) -> None:
+        batch: list[ResultRecord | StatUpdate] = []
+        deadline = time.monotonic() + STORE_FLUSH_INTERVAL
+        stop = False
+        while not stop:
+            try:
+                record = self.writes.get(timeout=max(deadline - time.monotonic(), 0))
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+            except queue.Empty:
+                pass
+
+            if batch and (stop or len(batch) >= STORE_BATCH or time.monotonic() >= deadline):
+                self.flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + STORE_FLUSH_INTERVAL
+
+    def flush(self, batch: list[ResultRecord | StatUpdate]) -> None:
+        records = [record for record in batch if isinstance(record, ResultRecord)]
+        updates = [update for update in batch if isinstance(update, StatUpdate)]
+        try:
+            with sqlmodel.Session(self.engine) as session:
+                for record in records:
+                    session.merge(record)
+
+                stats = {}
+                for update in updates:
+                    stat = stats.get(update.testcase_hash) or session.get(TestStat, update.testcase_hash)
+                    if stat is None:
+                        stat = TestStat(testcase_hash=update.testcase_hash)
+                        session.add(stat)
+                    stat.runs += 1
+                    stat.failures += int(update.failed)
+                    if update.time is not None:
+                        stat.timed += 1
+                        stat.total_time += update.time
+                        stat.max_time = max(stat.max_time, update.time)
+                    stat.updated_at = time.time()
+                    stats[update.testcase_hash] = stat
+                session.commit()
+        except sqlalchemy.exc.SQLAlchemyError as error:
+            logger.error("failed to write %d results", len(batch))
+            logger.exception(error)
+
+        with self.lock:
+            for record in records:
+                if self.pending.get(record.key) is record:
+                    del self.pending[record.key]
@@ -1,9 +1,13 @@
-from . import data, event, io, pydantic, logging
-from .data import str_to_timestamp, padding, mem_convert, wrap_dict, wipe_data
+from . import data, event, io, pydantic, logging, compare, process, cache, testset, profile
+from .data import str_to_timestamp, padding, mem_convert, wrap_dict, wipe_data, remove_later
 from .event import Event
-from .io import read, write, read_json, write_json
+from .io import read, write, read_json, write_json, digest, copy
 from .pydantic import get_fields
 from .logging import console_handler, formatter, AccessFormatter, ColorizedFormatter
+from .compare import wrong_answer_feedback, numeric_feedback, tail_excerpt
+from .process import MemoryWatcher, kill_tree, tree_rss, address_space_limit
+from .cache import LRUCache
+from .testset import Testset
 
 
 __all__ = [
@@ -12,19 +16,36 @@ __all__ = [
     "io",
     "pydantic",
     "logging",
+    "compare",
+    "process",
+    "cache",
+    "testset",
+    "profile",
     "read", 
     "write", 
     "read_json", 
     "write_json",
+    "digest",
+    "copy",
     "str_to_timestamp",
     "get_fields",
     "padding",
     "mem_convert",
     "wrap_dict",
     "wipe_data",
+    "remove_later",
     "Event",
     "console_handler",
     "formatter",
     "AccessFormatter",
     "ColorizedFormatter",
+    "wrong_answer_feedback",
+    "numeric_feedback",
+    "tail_excerpt",
+    "MemoryWatcher",
+    "address_space_limit",
+    "kill_tree",
+    "tree_rss",
+    "LRUCache",
+    "Testset",
 ]
@@ -0,0 +1,44 @@
+import collections
+import threading
+import typing
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.items: collections.OrderedDict[typing.Hashable, typing.Any] = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        if self.maxsize <= 0:
+            return default
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: typing.Hashable, value: typing.Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.items.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
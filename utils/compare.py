@@ -0,0 +1,194 @@
+import itertools
+import re
+import typing
+
+import numpy
+
+CHUNK_SIZE = 1 << 16
+BLOCK_SIZE = 1 << 20
+SPACE = re.compile(r"\s")
+
+
+def first_difference(a: str, b: str) -> int | None:
+    length = min(len(a), len(b))
+    for offset in range(0, length, CHUNK_SIZE):
+        if a[offset:offset + CHUNK_SIZE] != b[offset:offset + CHUNK_SIZE]:
+            for index in range(offset, min(offset + CHUNK_SIZE, length)):
+                if a[index] != b[index]:
+                    return index
+    if len(a) != len(b):
+        return length
+    return None
+
+
+def boundary(text: str, position: int) -> bool:
+    return position >= len(text) or text[position].isspace()
+
+
+def locate(a: str, b: str, position: int) -> typing.Tuple[int, int]:
+    line = a.count("\n", 0, position) + 1
+    line_start = a.rfind("\n", 0, position) + 1
+    prefix = a[line_start:position]
+    token = len(prefix.split())
+    if not prefix or prefix[-1].isspace() or (boundary(a, position) and boundary(b, position)):
+        token += 1
+    return line, token
+
+
+def excerpt(text: str, position: int, width: int) -> str:
+    line_start = text.rfind("\n", 0, position) + 1
+    line_end = text.find("\n", position)
+    if line_end == -1:
+        line_end = len(text)
+
+    start = max(line_start, position - width // 2)
+    end = min(line_end, start + width)
+    return (
+        ("..." if start > line_start else "")
+        + text[start:end]
+        + ("..." if end < line_end else "")
+        + ("<EOF>" if end == len(text) else "")
+    )
+
+
+def kept_lines(text: str, trim_endl: bool) -> typing.List[typing.Tuple[int, str]]:
+    result = []
+    offset = 0
+    for line in text.split("\n"):
+        if line or not trim_endl:
+            result.append((offset, line))
+        offset += len(line) + 1
+    return result
+
+
+def original_position(text: str, kept: typing.List[typing.Tuple[int, str]], normalized: str, position: int) -> int:
+    index = normalized.count("\n", 0, position)
+    if position > len(normalized) or index >= len(kept):
+        return len(text)
+    offset, line = kept[index]
+    return offset + min(position - normalized.rfind("\n", 0, position) - 1, len(line))
+
+
+def wrong_answer_feedback(
+        output: str,
+        expect: str,
+        limit: int = 256,
+        trim_endl: bool = False,
+        case: bool = False,
+) -> str:
+    kept_output = kept_lines(output, trim_endl)
+    kept_expect = kept_lines(expect, trim_endl)
+    a = "\n".join(line for _, line in kept_output)
+    b = "\n".join(line for _, line in kept_expect)
+    if case:
+        a, b = a.lower(), b.lower()
+
+    position = first_difference(a, b)
+    if position is None:
+        return f"Output matches expected ({len(output)} characters)"
+    if position == min(len(a), len(b)) and (a[position:position + 1] or b[position:position + 1]) == "\n":
+        position += 1
+
+    _, token = locate(b, a, position)
+    output_position = original_position(output, kept_output, a, position)
+    expect_position = original_position(expect, kept_expect, b, position)
+    line = expect.count("\n", 0, expect_position) + 1
+    output_line = output.count("\n", 0, output_position) + 1
+    width = max(limit // 2, 1)
+    return (
+        f"Wrong answer at line {line}, token {token}"
+        + (f" (line {output_line} of output)" if output_line != line else "") + "\n"
+        f"Expected: {excerpt(expect, expect_position, width)!r}\n"
+        f"Received: {excerpt(output, output_position, width)!r}\n"
+        f"Size: expected {len(expect)} characters, received {len(output)} characters"
+    )
+
+
+def tail_excerpt(text: str, limit: int = 256) -> str:
+    if len(text) <= limit:
+        return text
+    return f"...{text[-limit:]}\n({len(text)} characters in total)"
+
+
+def tokens(text: str, size: int = CHUNK_SIZE) -> typing.Iterator[typing.List[str]]:
+    buffer: typing.List[str] = []
+    position = 0
+    while position < len(text):
+        end = position + BLOCK_SIZE
+        if end < len(text):
+            space = SPACE.search(text, end)
+            end = space.start() if space else len(text)
+        buffer.extend(text[position:end].split())
+        position = end
+        while len(buffer) >= size:
+            yield buffer[:size]
+            del buffer[:size]
+    if buffer:
+        yield buffer
+
+
+def numbers(text: str, size: int = CHUNK_SIZE) -> typing.Iterator[typing.Tuple[typing.List[str], numpy.ndarray]]:
+    for chunk in tokens(text, size):
+        try:
+            yield chunk, numpy.array(chunk, dtype=numpy.float64)
+        except ValueError:
+            values = numpy.empty(len(chunk), dtype=numpy.float64)
+            for index, token in enumerate(chunk):
+                try:
+                    values[index] = float(token)
+                except ValueError:
+                    values[index] = numpy.nan
+            yield chunk, values
+
+
+def is_nan(token: str) -> bool:
+    return token.lstrip("+-").lower() == "nan"
+
+
+def numeric_mismatch(
+        output: str,
+        expect: str,
+        absolute: float,
+        relative: float,
+) -> typing.Tuple[int, str | None, str | None] | None:
+    offset = 0
+    empty = ([], numpy.empty(0))
+    for (received, a), (expected, b) in itertools.zip_longest(numbers(output), numbers(expect), fillvalue=empty):
+        length = min(len(a), len(b))
+        x, y = a[:length], b[:length]
+        with numpy.errstate(invalid="ignore", over="ignore"):
+            close = (x == y) | (
+                numpy.isfinite(y) & (numpy.abs(x - y) <= numpy.maximum(absolute, relative * numpy.abs(y)))
+            )
+        for index in numpy.flatnonzero(~close):
+            if received[index] != expected[index] and not (is_nan(received[index]) and is_nan(expected[index])):
+                return offset + int(index), received[index], expected[index]
+
+        if len(a) != len(b):
+            return (
+                offset + length,
+                received[length] if length < len(received) else None,
+                expected[length] if length < len(expected) else None,
+            )
+        offset += length
+    return None
+
+
+def numeric_feedback(output: str, expect: str, absolute: float, relative: float) -> str | None:
+    mismatch = numeric_mismatch(output, expect, absolute, relative)
+    if mismatch is None:
+        return None
+
+    index, received, expected = mismatch
+    if received is None or expected is None:
+        return (
+            f"Wrong answer at number {index + 1}\n"
+            f"Expected: {expected if expected is not None else '<EOF>'}\n"
+            f"Received: {received if received is not None else '<EOF>'}"
+        )
+    return (
+        f"Wrong answer at number {index + 1}\n"
+        f"Expected: {expected}\n"
+        f"Received: {received}\n"
+        f"Tolerance: absolute {absolute}, relative {relative}"
+    )
@@ -2,6 +2,7 @@ from datetime import datetime
 import typing
 import os
 import shutil
+import threading
 
 
 def str_to_timestamp(s: str) -> float:
@@ -34,3 +35,15 @@ def wipe_data(dir: str):
     if os.path.exists(dir):
         shutil.rmtree(dir)
     os.makedirs(dir)
+
+
+def remove_later(dir: str) -> threading.Thread:
+    thread = threading.Thread(
+        target=shutil.rmtree,
+        args=(dir,),
+        kwargs={"ignore_errors": True},
+        name="remove-later",
+        daemon=True,
+    )
+    thread.start()
+    return thread
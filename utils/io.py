@@ -1,7 +1,12 @@
+import fcntl
+import hashlib
 import json
 import os
+import shutil
 import typing
 
+FICLONE = 0x40049409
+
 json_indent = os.getenv("ENV", "development") == "development" and 4 or None
 
 
@@ -21,3 +26,25 @@ def write_json(
     file: str, content: dict[str, typing.Any], indent=json_indent
 ) -> None:
     return write(file, json.dumps(content, indent=indent))
+
+
+def digest(*files: str, chunk_size: int = 1 << 20) -> str:
+    hasher = hashlib.sha256()
+    for file in files:
+        with open(file, "rb") as f:
+            while chunk := f.read(chunk_size):
+                hasher.update(chunk)
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def copy(source: str, destination: str) -> None:
+    if os.path.lexists(destination):
+        os.remove(destination)
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, destination)
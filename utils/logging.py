@@ -1,10 +1,18 @@
 import logging
+import logging.handlers
+import atexit
 import copy
 import http
+import json
+import os
+import queue
 import click
 import sys
 import typing
 
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text" if os.getenv("ENV", "development") == "development" else "json")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+
 
 class ColorizedFormatter(logging.Formatter):
     level_name_colors = {
@@ -79,7 +87,102 @@ class AccessFormatter(ColorizedFormatter):
         return super().formatMessage(recordcopy)
 
 
+class JSONFormatter(logging.Formatter):
+    def __init__(self, name: str):
+        self.name = name
+        super().__init__()
+
+    def format(self, record):
+        data = {
+            "time": record.created,
+            "name": self.name,
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class SampleFilter(logging.Filter):
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.counters: dict[str, float] = {}
+
+    @staticmethod
+    def parse(spec: str) -> dict[str, float]:
+        rates = {}
+        for item in spec.split(","):
+            if "=" not in item:
+                continue
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+        return rates
+
+    def rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.rates.get("", 1.0)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.rate(record.name)
+        if rate >= 1:
+            return True
+
+        counter = self.counters.get(record.name, 0) + rate
+        if counter >= 1:
+            self.counters[record.name] = counter - 1
+            return True
+
+        self.counters[record.name] = counter
+        return False
+
+
+class AsyncHandler(logging.handlers.QueueHandler):
+    def __init__(self, target: logging.Handler):
+        super().__init__(log_queue)
+        self.target = target
+
+    def emit(self, record):
+        try:
+            self.enqueue((self.target, record))
+        except Exception:  # noqa
+            self.handleError(record)
+
+
+class AsyncListener(logging.handlers.QueueListener):
+    def handle(self, item):
+        target, record = item
+        if record.levelno >= target.level:
+            target.handle(record)
+
+
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+listener = AsyncListener(log_queue)
+sample_filter = SampleFilter(SampleFilter.parse(LOG_SAMPLE))
+
+
+def start_listener():
+    if listener._thread is None:  # noqa
+        listener.start()
+        atexit.register(stop_listener)
+
+
+def stop_listener():
+    if listener._thread is not None:  # noqa
+        listener.stop()
+
+
 def formatter(name: str, formatter_: logging.Formatter = ColorizedFormatter):
+    if LOG_FORMAT == "json":
+        return JSONFormatter(name)
     return formatter_( # noqa
         f"%(asctime)s.%(msecs)06d :: {name:<{10}} :: %(levelname)-7s :: %(message)s",
         "%Y-%m-%d %H:%M:%S"
@@ -87,6 +190,10 @@ def formatter(name: str, formatter_: logging.Formatter = ColorizedFormatter):
 
 
 def console_handler(name: str, formatter_: logging.Formatter = ColorizedFormatter):
-    handler = logging.StreamHandler()
-    handler.setFormatter(formatter(name, formatter_))
+    target = logging.StreamHandler()
+    target.setFormatter(formatter(name, formatter_))
+
+    handler = AsyncHandler(target)
+    handler.addFilter(sample_filter)
+    start_listener()
     return handler
@@ -0,0 +1,103 @@
+import resource
+import threading
+import time
+import typing
+
+import psutil
+
+WRAPPERS = {"bash", "sh", "time", "timeout"}
+
+
+def tree(pid: int) -> typing.List[psutil.Process]:
+    try:
+        root = psutil.Process(pid)
+        return [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return []
+
+
+def members(pid: int) -> typing.List[psutil.Process]:
+    result = []
+    for process in tree(pid):
+        try:
+            if process.name() not in WRAPPERS:
+                result.append(process)
+        except psutil.Error:
+            continue
+    return result
+
+
+def rss(processes: typing.Iterable[psutil.Process]) -> typing.Tuple[int, bool]:
+    total = 0
+    gone = False
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            gone = True
+    return total, gone
+
+
+def tree_rss(pid: int) -> int:
+    return rss(members(pid))[0]
+
+
+def address_space_limit(limit: int) -> typing.Callable[[], None]:
+    def apply() -> None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+
+def kill_tree(pid: int) -> None:
+    for process in reversed(tree(pid)):
+        try:
+            process.kill()
+        except psutil.Error:
+            continue
+
+
+class MemoryWatcher(threading.Thread):
+    def __init__(
+            self,
+            pid: int,
+            limit: int | None,
+            min_interval: float = 0.001,
+            max_interval: float = 0.05,
+    ):
+        super().__init__(name=f"memory-watcher-{pid}", daemon=True)
+        self.pid = pid
+        self.limit = limit
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.peak = 0
+        self.exceeded = False
+        self.stopped = threading.Event()
+
+    def run(self):
+        interval = self.min_interval
+        processes = members(self.pid)
+        scanned = time.monotonic()
+        while not self.stopped.is_set():
+            used, gone = rss(processes)
+            if used > self.peak:
+                self.peak = used
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+
+            if gone or interval > self.min_interval or time.monotonic() - scanned >= self.max_interval:
+                processes = members(self.pid)
+                scanned = time.monotonic()
+
+            if self.limit is not None and used > self.limit:
+                self.exceeded = True
+                kill_tree(self.pid)
+                return
+
+            self.stopped.wait(interval)
+
+    def stop(self) -> int:
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        return self.peak
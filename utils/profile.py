@@ -0,0 +1,46 @@
+import collections
+import os
+import sys
+import threading
+import time
+import typing
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.005))
+
+lock = threading.Lock()
+
+
+def frame_name(frame: typing.Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample(seconds: float, interval: float = PROFILE_INTERVAL) -> typing.Tuple[collections.Counter, int]:
+    if not lock.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+
+    try:
+        own = threading.get_ident()
+        stacks: collections.Counter = collections.Counter()
+        rounds = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(stack))] += 1
+            rounds += 1
+            time.sleep(interval)
+        return stacks, rounds
+    finally:
+        lock.release()
+
+
+def collapse(stacks: collections.Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,137 @@
+import hashlib
+import mmap
+import os
+import posixpath
+import shutil
+import struct
+import tarfile
+import typing
+import zipfile
+
+ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+
+class TestsetTooLarge(ValueError):
+    pass
+
+
+class Entry(typing.NamedTuple):
+    source: int
+    offset: int
+    size: int
+
+
+def member_key(name: str) -> typing.Optional[typing.Tuple[int, str]]:
+    parts = [part for part in posixpath.normpath(name).split("/") if part not in ("", ".")]
+    if len(parts) < 2 or not parts[-2].isdigit():
+        return None
+    return int(parts[-2]), parts[-1]
+
+
+class Testset:
+    def __init__(self, archive: str, blob: str):
+        self.archive = archive
+        self.blob = blob
+        self.entries: typing.Dict[typing.Tuple[int, str], Entry] = {}
+        self.maps: typing.List[typing.Optional[mmap.mmap]] = [None, None]
+        self.limit: typing.Optional[int] = None
+
+    def __contains__(self, key: typing.Tuple[int, str]) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def indices(self) -> typing.List[int]:
+        return sorted({index for index, _ in self.entries})
+
+    def open(self, limit: typing.Optional[int] = None) -> "Testset":
+        self.limit = limit
+        with open(self.blob, "wb") as blob:
+            if zipfile.is_zipfile(self.archive):
+                self.index_zip(blob)
+            elif tarfile.is_tarfile(self.archive):
+                self.index_tar(blob)
+            else:
+                raise ValueError("testset must be a tar or zip archive")
+
+        for source, path in enumerate((self.archive, self.blob)):
+            if os.path.getsize(path) > 0:
+                with open(path, "rb") as file:
+                    self.maps[source] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def close(self) -> None:
+        for source, mapped in enumerate(self.maps):
+            if mapped is not None:
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass
+                self.maps[source] = None
+
+    def expand(self, blob: typing.BinaryIO, size: int) -> None:
+        if self.limit is not None and blob.tell() + size > self.limit:
+            raise TestsetTooLarge(f"testset expands beyond {self.limit} bytes")
+
+    def index_zip(self, blob: typing.BinaryIO) -> None:
+        with zipfile.ZipFile(self.archive) as archive, open(self.archive, "rb") as raw:
+            for info in archive.infolist():
+                key = member_key(info.filename)
+                if info.is_dir() or key is None:
+                    continue
+
+                if info.compress_type == zipfile.ZIP_STORED:
+                    raw.seek(info.header_offset)
+                    _, name_length, extra_length = ZIP_LOCAL_HEADER.unpack(raw.read(ZIP_LOCAL_HEADER.size))
+                    offset = info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+                    self.entries[key] = Entry(0, offset, info.file_size)
+                else:
+                    self.expand(blob, info.file_size)
+                    offset = blob.tell()
+                    with archive.open(info) as member:
+                        shutil.copyfileobj(member, blob)
+                    self.entries[key] = Entry(1, offset, info.file_size)
+
+    def index_tar(self, blob: typing.BinaryIO) -> None:
+        try:
+            with tarfile.open(self.archive, "r:") as archive:
+                for member in archive:
+                    key = member_key(member.name)
+                    if member.isfile() and key is not None:
+                        self.entries[key] = Entry(0, member.offset_data, member.size)
+            return
+        except tarfile.ReadError:
+            self.entries.clear()
+
+        with tarfile.open(self.archive, "r|*") as archive:
+            for member in archive:
+                key = member_key(member.name)
+                if not member.isfile() or key is None:
+                    continue
+                self.expand(blob, member.size)
+                offset = blob.tell()
+                shutil.copyfileobj(archive.extractfile(member), blob)
+                self.entries[key] = Entry(1, offset, member.size)
+
+    def view(self, index: int, name: str) -> memoryview:
+        entry = self.entries[(index, name)]
+        if entry.size == 0:
+            return memoryview(b"")
+        return memoryview(self.maps[entry.source])[entry.offset:entry.offset + entry.size]
+
+    def read(self, index: int, name: str) -> str:
+        return bytes(self.view(index, name)).decode()
+
+    def digest(self, index: int, *names: str) -> str:
+        hasher = hashlib.sha256()
+        for name in names:
+            hasher.update(self.view(index, name))
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def extract(self, index: int, name: str, destination: str) -> None:
+        if os.path.lexists(destination):
+            os.remove(destination)
+        with open(destination, "wb") as file:
+            file.write(self.view(index, name))
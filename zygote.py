@@ -0,0 +1,202 @@
+import json
+import os
+import select
+import subprocess
+import sys
+import time
+import typing
+
+__all__ = [
+    "Zygote",
+]
+
+PRELOAD = [
+    "array", "bisect", "collections", "copy", "decimal", "fractions", "functools", "heapq",
+    "io", "itertools", "math", "operator", "random", "re", "string", "sys", "typing",
+]
+
+
+class Zygote:
+    process: subprocess.Popen = None
+    boot_time: float = None
+
+    def __init__(self, argv: typing.List[str], cwd: str, preload: typing.List[str] = None) -> None:
+        self.argv = argv
+        self.cwd = cwd
+        self.preload = PRELOAD if preload is None else preload
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            [*self.argv, os.path.abspath(__file__), *self.preload],
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        if self.process.stdout.readline().strip() != "ready":
+            self.stop()
+            raise RuntimeError("zygote failed to start")
+        self.boot_time = time.perf_counter() - start
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def run(
+            self,
+            script: str,
+            stdin: typing.Optional[str],
+            stdout: str,
+            time_limit: float,
+            memory_limit: typing.Optional[int] = None,
+            started: typing.Optional[typing.Callable[[int], None]] = None,
+    ) -> typing.Dict[str, typing.Any]:
+        if not self.alive:
+            self.start()
+
+        self.process.stdin.write(json.dumps({
+            "script": script,
+            "stdin": stdin,
+            "stdout": stdout,
+            "time": time_limit,
+            "memory": memory_limit,
+        }) + "\n")
+        self.process.stdin.flush()
+
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                self.process = None
+                raise RuntimeError("zygote exited unexpectedly")
+            reply = json.loads(line)
+            if "pid" not in reply:
+                return reply
+            if started is not None:
+                started(reply["pid"])
+
+
+def serve(preload: typing.List[str]) -> None:
+    import importlib
+    import resource
+    import runpy
+    import signal
+
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    control_in = os.fdopen(os.dup(0), "r")
+    control_out = os.fdopen(os.dup(1), "w")
+    os.set_inheritable(control_in.fileno(), False)
+    os.set_inheritable(control_out.fileno(), False)
+    control_out.write("ready\n")
+    control_out.flush()
+
+    for line in control_in:
+        request = json.loads(line)
+        ready_r, ready_w = os.pipe()
+        requested = time.perf_counter()
+        pid = os.fork()
+
+        if pid == 0:
+            try:
+                control_in.close()
+                control_out.close()
+                os.close(ready_r)
+
+                stdin = os.open(request["stdin"] or os.devnull, os.O_RDONLY)
+                stdout = os.open(request["stdout"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                os.dup2(stdin, 0)
+                os.dup2(stdout, 1)
+                os.dup2(devnull, 2)
+
+                cpu = int(request["time"]) + 1
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+                if request["memory"]:
+                    resource.setrlimit(resource.RLIMIT_AS, (request["memory"], request["memory"]))
+
+                sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+                sys.stdout = sys.__stdout__ = open(1, "w", closefd=False)
+                sys.stderr = sys.__stderr__ = open(2, "w", closefd=False)
+                sys.argv = [request["script"]]
+                sys.path.insert(0, os.path.dirname(os.path.abspath(request["script"])))
+                if "random" in sys.modules:
+                    sys.modules["random"].seed()
+
+                os.write(ready_w, b"1")
+                os.close(ready_w)
+                code = 0
+                try:
+                    runpy.run_path(request["script"], run_name="__main__")
+                except SystemExit as error:
+                    code = error.code if isinstance(error.code, int) else (0 if error.code is None else 1)
+                except BaseException:  # noqa
+                    import traceback
+                    traceback.print_exc()
+                    code = 1
+                sys.stdout.flush()
+                os._exit(code)
+            finally:
+                os._exit(1)
+
+        os.close(ready_w)
+        os.read(ready_r, 1)
+        started = time.perf_counter()
+        os.close(ready_r)
+        control_out.write(json.dumps({"pid": pid}) + "\n")
+        control_out.flush()
+
+        timeout = False
+        waited = 0
+        try:
+            pidfd = os.pidfd_open(pid)
+            timeout = not select.select([pidfd], [], [], request["time"])[0]
+            os.close(pidfd)
+        except (AttributeError, OSError):
+            while True:
+                waited, status, usage = os.wait4(pid, os.WNOHANG)
+                if waited:
+                    break
+                if time.perf_counter() - started >= request["time"]:
+                    timeout = True
+                    break
+                time.sleep(0.001)
+        if timeout:
+            os.kill(pid, signal.SIGKILL)
+
+        if not waited:
+            _, status, usage = os.wait4(pid, 0)
+        finished = time.perf_counter()
+        control_out.write(json.dumps({
+            "startup": started - requested,
+            "time": finished - started,
+            "memory": usage.ru_maxrss,
+            "return": os.WEXITSTATUS(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status),
+            "timeout": timeout,
+        }) + "\n")
+        control_out.flush()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1:])